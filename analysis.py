@@ -0,0 +1,50 @@
+"""Upload analysis: colour extraction plus catalog matching"""
+import hashlib
+from collections import namedtuple
+
+import metrics
+import settings
+import workers
+from cache import LRUCache
+
+Analysis = namedtuple('Analysis', ['colors', 'matches'])
+
+# Results keyed by upload content and catalog version, so Streamlit reruns
+# and repeat uploads of the same photo skip decoding and quantizing
+result_cache = LRUCache(settings.RESULT_CACHE_SIZE)
+
+
+def _cache_metrics():
+    stats = result_cache.stats()
+    return [('result_cache_hits_total', 'counter', 'Result cache hits', stats['hits']),
+            ('result_cache_misses_total', 'counter', 'Result cache misses', stats['misses']),
+            ('result_cache_entries', 'gauge', 'Results held in the cache', stats['entries'])]
+
+
+metrics.register_collector(_cache_metrics)
+
+
+def analyze(data, catalog, k=3, metric=None, preview_width=None):
+    """Extract the palette of an encoded image and match it to the catalog
+
+    Extraction runs on the shared worker pool when COLORMATCH_WORKERS is
+    set (see workers.py). With preview_width, colors.preview holds a
+    JPEG thumbnail of the upload for display.
+    """
+    colors = workers.extract_colors(data, preview_width=preview_width)
+    with metrics.timer('match'):
+        matches = catalog.best_matches(colors.palette, k=k, metric=metric)
+    return Analysis(colors, matches)
+
+
+def cached_analyze(data, catalog, k=3, metric=None, preview_width=None):
+    """analyze() through the process-wide result cache"""
+    metric = metric or settings.MATCH_METRIC
+    key = (hashlib.blake2b(data, digest_size=16).digest(), catalog.version, k, metric,
+           preview_width)
+    result = result_cache.get(key)
+    if result is None:
+        metrics.observe('upload_bytes', len(data))
+        result = analyze(data, catalog, k, metric, preview_width)
+        result_cache.put(key, result)
+    return result
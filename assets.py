@@ -0,0 +1,139 @@
+"""Static page fragments (CSS, header with logo), built once per process
+
+Streamlit re-executes app.py on every interaction, so anything computed
+at its top level is redone per rerun. The fragments here are memoized in
+this module instead and only rebuilt when the files they come from
+change, which costs a few os.stat calls per rerun.
+"""
+import base64
+import os
+import re
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STYLES_PATH = os.path.join(HERE, 'styles.css')
+
+# Check for logo file first - improved detection
+LOGO_PATHS = [
+    "PS LOGO.png", "PS LOGO.jpg", "PS LOGO.jpeg",
+    "ps logo.png", "ps logo.jpg", "ps logo.jpeg",
+    "PS_LOGO.png", "PS_LOGO.jpg", "PS_LOGO.jpeg",
+    "logo.png", "logo.jpg", "logo.jpeg",
+    "purplestore-logo.png", "purplestore-logo.jpg",
+    "assets/logo.png", "assets/PS LOGO.png",
+    "logo.svg"
+]
+
+LOGO_FALLBACK_HTML = '<div style="color: #A87DC0; font-weight: 700; font-size: 2.5rem; text-align: center; width: 100%;">Purple Store</div>'
+
+
+def _stat_signature(paths):
+    """mtime/size of each path (None when missing); changes when any file does"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class _Memo:
+    """Last value of build(), kept until the watched files change"""
+
+    def __init__(self, build):
+        self.build = build
+        self._key = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self, watched, *args):
+        key = (tuple(watched), _stat_signature(watched), args)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._value = self.build(*args)
+                    self._key = key
+        return self._value
+
+
+def minify_css(css):
+    """Drop comments and collapse whitespace"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def _build_style_html():
+    with open(STYLES_PATH, encoding='utf-8') as f:
+        return '<style>' + minify_css(f.read()) + '</style>'
+
+
+def find_logo():
+    """First logo file found in the working directory or next to the app"""
+    current_dir = os.getcwd()
+    for path in LOGO_PATHS:
+        for base in (current_dir, HERE):
+            full_path = os.path.join(base, path)
+            if os.path.exists(full_path):
+                return full_path
+    return None
+
+
+def _logo_html(logo_path):
+    if not logo_path:
+        return LOGO_FALLBACK_HTML
+    try:
+        with open(logo_path, "rb") as f:
+            logo_data = base64.b64encode(f.read()).decode()
+        logo_ext = logo_path.split('.')[-1].lower()
+        if logo_ext == 'jpg':
+            logo_ext = 'jpeg'
+        return f'<img src="data:image/{logo_ext};base64,{logo_data}" class="logo-image" alt="PurpleStore Logo" style="max-height: 50px; width: auto; height: auto; display: block; margin: 0 auto; object-fit: contain;">'
+    except Exception:
+        # Fallback to relative path
+        try:
+            rel_path = os.path.relpath(logo_path, os.getcwd())
+            return f'<img src="{rel_path}" class="logo-image" alt="PurpleStore Logo" style="max-height: 50px; width: auto; height: auto; display: block; margin: 0 auto; object-fit: contain;">'
+        except ValueError:
+            return LOGO_FALLBACK_HTML
+
+
+def _build_header_html(logo_path):
+    # Complete header HTML - build as single string
+    return ''.join([
+        '<div class="main-header">',
+        '<div class="header-left"><div class="icon-circle"><svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M21 21l-6-6m2-5a7 7 0 11-14 0 7 7 0 0114 0z" /></svg></div></div>',
+        '<div class="header-center">' + _logo_html(logo_path) + '</div>',
+        '<div class="header-right">',
+        '<div class="icon-circle"><svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M3 3h2l.4 2M7 13h10l4-8H5.4M7 13L5.4 5M7 13l-2.293 2.293c-.63.63-.184 1.707.707 1.707H17m0 0a2 2 0 100 4 2 2 0 000-4zm-8 2a2 2 0 11-4 0 2 2 0 014 0z" /></svg><div class="badge">1</div></div>',
+        '<div class="icon-circle"><svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4.318 6.318a4.5 4.5 0 000 6.364L12 20.364l7.682-7.682a4.5 4.5 0 00-6.364-6.364L12 7.636l-1.318-1.318a4.5 4.5 0 00-6.364 0z" /></svg><div class="badge">0</div></div>',
+        '<div class="icon-circle"><svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M16 7a4 4 0 11-8 0 4 4 0 018 0zM12 14a7 7 0 00-7 7h14a7 7 0 00-7-7z" /></svg><svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor" style="width: 12px; height: 12px; margin-left: -5px;"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M19 9l-7 7-7-7" /></svg></div>',
+        '<button class="contact-btn">Contact Us</button>',
+        '</div></div>',
+    ])
+
+
+_style = _Memo(_build_style_html)
+_logo = _Memo(find_logo)
+_header = _Memo(_build_header_html)
+
+
+def style_html():
+    """Minified <style> block for the page"""
+    return _style.get([STYLES_PATH])
+
+
+def header_html():
+    """Header bar HTML with the logo inlined
+
+    The logo search is redone only when a directory it looks in changes
+    (a logo added, removed or renamed), the header only when the logo
+    file itself changes.
+    """
+    current_dir = os.getcwd()
+    logo_path = _logo.get([current_dir, HERE,
+                           os.path.join(current_dir, 'assets'), os.path.join(HERE, 'assets')])
+    return _header.get([logo_path] if logo_path else [], logo_path)
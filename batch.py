@@ -0,0 +1,205 @@
+"""Batch colour matching for directories of outfit photos
+
+    python batch.py photos/ -o matches.jsonl
+    python batch.py --manifest paths.txt -o matches.csv --workers 8
+
+Images are processed across a process pool and results are streamed to a
+JSONL or CSV file (by extension) as they finish. Images that already have
+a row in the output file are skipped, and a row left half-written is
+dropped, so an interrupted run can simply be restarted with the same
+arguments.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import settings
+from analysis import analyze
+from catalog import open_catalog
+from colormatch import rgb_to_hex
+from matcher import METRICS
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CSV_FIELDS = ['path', 'seconds', 'dominant', 'palette', 'matches', 'match_urls', 'error']
+
+_catalog = None
+
+
+def _init_worker(catalog_path):
+    global _catalog
+    _catalog = open_catalog(catalog_path)
+
+
+def process_image(path, k=3, metric=None):
+    """Analyse one image file; returns a flat result record"""
+    start = time.perf_counter()
+    record = {'path': path}
+    try:
+        with open(path, 'rb') as f:
+            analysis = analyze(f.read(), _catalog, k=k, metric=metric)
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+    else:
+        record['dominant'] = rgb_to_hex(analysis.colors.dominant)
+        record['palette'] = [rgb_to_hex(c) for c in analysis.colors.palette]
+        record['populations'] = analysis.colors.populations
+        record['matches'] = [s.name for s in analysis.matches]
+        record['match_urls'] = [s.url for s in analysis.matches]
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def find_images(directory):
+    """Image files under directory, in a stable order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def read_manifest(path):
+    """Image paths listed one per line (blank lines and # comments ignored)"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+class JSONLWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, record):
+        self.f.write(json.dumps(record) + '\n')
+        self.f.flush()
+
+
+class CSVWriter:
+    def __init__(self, f, write_header):
+        self.f = f
+        self.writer = csv.DictWriter(f, CSV_FIELDS, extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, record):
+        row = dict(record)
+        for field in ('palette', 'matches', 'match_urls'):
+            if field in row:
+                row[field] = ';'.join(row[field])
+        self.writer.writerow(row)
+        self.f.flush()
+
+
+def done_paths(output, is_csv):
+    """Paths that already have a row in an existing output file"""
+    if not os.path.exists(output):
+        return set()
+    with open(output, newline='', encoding='utf-8') as f:
+        if is_csv:
+            return {row['path'] for row in csv.DictReader(f)}
+        done = set()
+        for line in f:
+            try:
+                done.add(json.loads(line)['path'])
+            except (ValueError, KeyError):
+                continue  # not a record; skipped rather than stopping the resume
+        return done
+
+
+def trim_partial_line(output):
+    """Cut an unterminated last line (an interrupted write) off output
+
+    Returns the size of what is left, 0 if output does not exist.
+    """
+    try:
+        f = open(output, 'r+b')
+    except FileNotFoundError:
+        return 0
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        size = end
+        # Walk back in blocks to the last newline
+        while size:
+            start = max(0, size - 65536)
+            f.seek(start)
+            block = f.read(size - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                size = start + newline + 1
+                break
+            size = start
+        if size != end:
+            f.truncate(size)
+    return size
+
+
+def run(paths, output, catalog_path, workers, k=3, metric=None, max_in_flight=None):
+    """Process paths into output; returns (processed, skipped, failed)"""
+    is_csv = output.lower().endswith('.csv')
+    # Appending after a fragment would glue the next record onto it
+    size = trim_partial_line(output)
+    write_header = is_csv and not size
+    done = done_paths(output, is_csv)
+    max_in_flight = max_in_flight or workers * 4
+    processed = skipped = failed = 0
+
+    with open(output, 'a', newline='', encoding='utf-8') as f, \
+            ProcessPoolExecutor(workers, initializer=_init_worker,
+                                initargs=(catalog_path,)) as pool:
+        writer = CSVWriter(f, write_header) if is_csv else JSONLWriter(f)
+        pending = set()
+
+        def drain(return_when):
+            nonlocal pending, processed, failed
+            finished, pending = wait(pending, return_when=return_when)
+            for future in finished:
+                record = future.result()
+                writer.write(record)
+                processed += 1
+                if 'error' in record:
+                    failed += 1
+                    print(f"{record['path']}: {record['error']}", file=sys.stderr)
+
+        for path in paths:
+            if path in done:
+                skipped += 1
+                continue
+            # Keep a bounded number of images in flight
+            if len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+            pending.add(pool.submit(process_image, path, k, metric))
+        if pending:
+            drain(ALL_COMPLETED)
+    return processed, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', nargs='?', help='directory to search for images')
+    parser.add_argument('--manifest', help='file listing image paths, one per line')
+    parser.add_argument('-o', '--output', required=True, help='.jsonl or .csv results file')
+    parser.add_argument('--catalog', default=settings.CATALOG)
+    parser.add_argument('-k', type=int, default=3, help='matches per image')
+    parser.add_argument('--metric', choices=METRICS, help='colour difference used for matching')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error('give either a directory or --manifest')
+    paths = read_manifest(args.manifest) if args.manifest else find_images(args.directory)
+
+    start = time.perf_counter()
+    processed, skipped, failed = run(paths, args.output, args.catalog, args.workers,
+                                       args.k, args.metric)
+    print(f"processed {processed} images ({failed} failed), skipped {skipped} "
+          f"already done, in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
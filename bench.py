@@ -0,0 +1,558 @@
+"""Benchmarks for the colour matcher
+
+    python bench.py decode [--sizes 0.3 2 12]
+    python bench.py quantize [--images 20]
+    python bench.py match [--rows 43 1000 10000 100000]
+    python bench.py lut [--rows 43 1000] [--bits 5 6]
+    python bench.py catalog [--rows 43 10000 100000]
+    python bench.py roi [--images 20]
+    python bench.py concurrency [--threads 8] [--workers 4]
+    python bench.py importtime [--budget-ms 50]
+    python bench.py memory [--slack-mb 64]
+    python bench.py suite [--save baseline.json] [--compare baseline.json]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from colorthief import MMCQ
+from PIL import Image
+
+import mmcq
+import render
+import settings
+import workers
+from analysis import analyze
+from catalog import Catalog, read_binary
+from colorlut import ColorLUT
+from extract import decode_image, extract_colors, roi_pixels, sample_pixels, sample_stride
+from matcher import METRICS, match_palette, redmean_distances
+
+
+def synthetic_photo(megapixels, seed=0):
+    """JPEG bytes of an outfit-like test image (colour blocks, gradient, noise)"""
+    rng = np.random.default_rng(seed)
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(megapixels * 1e6 / width)
+    colours = rng.integers(0, 256, (5, 3), dtype=np.uint8)
+    layout = rng.choice(5, size=(6, 8), p=[0.4, 0.25, 0.15, 0.12, 0.08])
+    image = Image.fromarray(colours[layout]).resize((width, height), Image.NEAREST)
+    pixels = np.asarray(image, dtype=np.int16)
+    pixels += np.linspace(-20, 20, width, dtype=np.int16)[None, :, None]
+    pixels += rng.integers(-6, 7, pixels.shape, dtype=np.int16)
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, 'JPEG', quality=90)
+    return buf.getvalue()
+
+
+def synthetic_scene(seed=0, megapixels=2):
+    """JPEG bytes of a person on a plain background, and the garment colours
+
+    Wall and floor fill the frame, with a skin-toned face and hands
+    around a two-colour outfit in the middle.
+    """
+    rng = np.random.default_rng(seed)
+    width = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    height = int(megapixels * 1e6 / width)
+    wall, floor = rng.integers(150, 235, (2, 3))
+    skin = np.array([224, 172, 140]) + rng.integers(-30, 20, 3)
+    garment = rng.integers(0, 256, (2, 3))
+    pixels = np.empty((height, width, 3), dtype=np.int16)
+    pixels[:] = wall
+    pixels[int(height * 0.8):] = floor
+    cx = width // 2
+    pixels[int(height * 0.08):int(height * 0.22), cx - width // 12:cx + width // 12] = skin
+    pixels[int(height * 0.22):int(height * 0.6), cx - width // 5:cx + width // 5] = garment[0]
+    pixels[int(height * 0.6):int(height * 0.92), cx - width // 6:cx + width // 6] = garment[1]
+    pixels[int(height * 0.5):int(height * 0.58), cx - width // 4:cx - width // 5] = skin
+    pixels += rng.integers(-6, 7, pixels.shape, dtype=np.int16)
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, 'JPEG', quality=90)
+    return buf.getvalue(), garment
+
+
+def synthetic_png(width, height, colour=(120, 40, 90), rows=None):
+    """PNG bytes of a flat image, written without allocating the bitmap
+
+    Compresses to almost nothing, so it also stands in for a
+    decompression bomb at large sizes. With rows, only that many rows of
+    pixel data follow the header (a truncated file claiming height rows).
+    """
+    def chunk(kind, body):
+        return (len(body).to_bytes(4, 'big') + kind + body
+                + zlib.crc32(kind + body).to_bytes(4, 'big'))
+
+    row = b'\x00' + bytes(colour) * width
+    compressor = zlib.compressobj(9)
+    idat = [compressor.compress(row) for _ in range(height if rows is None else rows)]
+    idat.append(compressor.flush())
+    header = width.to_bytes(4, 'big') + height.to_bytes(4, 'big') + bytes([8, 2, 0, 0, 0])
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', b''.join(idat)) + chunk(b'IEND', b''))
+
+
+def synthetic_catalog(rows, seed=0):
+    """Catalog of random shades, about 10% out of stock"""
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (rows, 3))
+    stock = np.where(rng.random(rows) < 0.1, 0, rng.integers(1, 200, rows))
+    return Catalog([f'Shade {i}' for i in range(rows)],
+                   ['#{:02x}{:02x}{:02x}'.format(*c) for c in rgb],
+                   stock.tolist(),
+                   [f'https://example.com/shade/{i}' for i in range(rows)])
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def palette_error(palette, reference):
+    """Mean redmean distance from each swatch to the closest reference swatch"""
+    return float(redmean_distances(palette, reference).min(axis=1).mean())
+
+
+def bench_decode(args):
+    """Reduced-resolution decode vs the full-resolution ColorThief path"""
+    catalog = Catalog.from_csv(args.catalog)
+    print(f"{'MP':>6} {'full s':>8} {'budget s':>9} {'swatch err':>11} {'top-3 shared':>11}")
+    for mp in args.sizes:
+        data = synthetic_photo(mp)
+        full, t_full = _timed(extract_colors, data, quality=10, pixel_budget=0)
+        fast, t_fast = _timed(extract_colors, data)
+        full, fast = full.palette, fast.palette
+        overlap = len({s.name for s in catalog.best_matches(full)}
+                      & {s.name for s in catalog.best_matches(fast)})
+        print(f"{mp:>6} {t_full:>8.3f} {t_fast:>9.3f} "
+              f"{palette_error(fast, full):>11.1f} {overlap:>10}/3")
+
+
+def bench_quantize(args):
+    """NumPy MMCQ vs ColorThief's pure-Python MMCQ on a fixed corpus"""
+    t_ref = t_new = 0.0
+    worst = 0.0
+    for seed in range(args.images):
+        image = decode_image(synthetic_photo(args.megapixels, seed), pixel_budget=0)
+        pixels = sample_pixels(image, 10)
+        cmap, t = _timed(MMCQ.quantize, pixels.tolist(), 5)
+        t_ref += t
+        (palette, _), t = _timed(mmcq.quantize, pixels, 5)
+        t_new += t
+        worst = max(worst, float(np.abs(np.subtract(palette, cmap.palette)).max()))
+    print(f"{args.images} images at {args.megapixels} MP, stride 10")
+    print(f"colorthief {t_ref / args.images:.3f} s/image, "
+          f"numpy {t_new / args.images:.3f} s/image, "
+          f"max channel difference {worst:.0f}")
+
+
+def bench_roi(args):
+    """Pixels quantized, quantize time and palette relevance with and without the ROI stage"""
+    totals = {False: [0, 0.0, 0.0], True: [0, 0.0, 0.0]}
+    for seed in range(args.images):
+        data, garment = synthetic_scene(seed, args.megapixels)
+        image = decode_image(data)
+        for roi in (False, True):
+            if roi:
+                pixels = roi_pixels(image)
+            else:
+                pixels = sample_pixels(image, sample_stride(image.width * image.height))
+            (palette, _), t = _timed(mmcq.quantize, pixels, 5)
+            totals[roi][0] += len(pixels)
+            totals[roi][1] += t
+            totals[roi][2] += palette_error(palette, garment)
+    print(f"{args.images} scenes at {args.megapixels} MP; error is the mean redmean "
+          f"distance from a swatch to the nearest garment colour")
+    for roi, (n, t, error) in totals.items():
+        print(f"{'roi' if roi else 'full frame':<10} {n / args.images:>8.0f} pixels "
+              f"{t / args.images * 1000:>7.2f} ms quantize {error / args.images:>7.1f} error")
+
+
+def bench_match(args):
+    """Matching cost per palette for each metric and catalog size
+
+    redmean goes through the spatial index once a catalog has
+    COLORMATCH_INDEX_MIN_ROWS rows.
+    """
+    palette = np.random.default_rng(1).integers(0, 256, (5, 3)).tolist()
+    print(f"{'rows':>8} " + ' '.join(f'{m + " ms":>14}' for m in METRICS))
+    for rows in args.rows:
+        catalog = synthetic_catalog(rows)
+        timings = []
+        for metric in METRICS:
+            repeat = max(3, 20000 // rows)
+            catalog.best_matches(palette, metric=metric)  # warm up
+            start = time.perf_counter()
+            for _ in range(repeat):
+                catalog.best_matches(palette, metric=metric)
+            timings.append((time.perf_counter() - start) / repeat * 1000)
+        print(f"{rows:>8} " + ' '.join(f'{t:>14.3f}' for t in timings))
+
+
+def bench_catalog(args):
+    """Load time and size of a catalog from CSV vs the compiled mmap format"""
+    print(f"{'rows':>8} {'csv ms':>8} {'open ms':>8} {'mmap ms':>8} {'csv MB':>7} {'bin MB':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            shades = synthetic_catalog(rows)
+            csv_path, bin_path = os.path.join(tmp, 'c.csv'), os.path.join(tmp, 'c.bin')
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'hex', 'stock', 'url'])
+                writer.writerows(zip(shades.names, shades.hexes, shades.stock.tolist(), shades.urls))
+            shades.save(bin_path)
+            t_csv = min(_timed(Catalog.from_csv, csv_path)[1] for _ in range(3))
+            t_open = min(_timed(Catalog.open, bin_path)[1] for _ in range(3))
+            t_map = min(_timed(read_binary, bin_path)[1] for _ in range(3))
+            print(f"{rows:>8} {t_csv * 1000:>8.1f} {t_open * 1000:>8.1f} {t_map * 1000:>8.2f} "
+                  f"{os.path.getsize(csv_path) / 2**20:>7.2f} {os.path.getsize(bin_path) / 2**20:>7.2f}")
+    print("open includes building the spatial indexes (catalogs of "
+          f"{settings.INDEX_MIN_ROWS}+ rows); mmap is mapping the file alone")
+
+
+def bench_lut(args):
+    """Lookup table memory, speed and accuracy against exact matching"""
+    rng = np.random.default_rng(2)
+    palettes = rng.integers(0, 256, (args.palettes, 5, 3))
+    print(f"{'rows':>6} {'bits':>4} {'build s':>8} {'MB':>7} {'lut us':>7} "
+          f"{'exact us':>9} {'top-1 %':>8} {'top-3 %':>8}")
+    for rows in args.rows:
+        catalog = synthetic_catalog(rows)
+        stocked = np.flatnonzero(catalog.in_stock)
+        for bits in args.bits:
+            lut, t_build = _timed(ColorLUT.build, catalog.rgb[stocked], stocked, bits)
+            top1 = top3 = 0
+            t_lut = t_exact = 0.0
+            for palette in palettes:
+                (approx, _), t = _timed(lut.query, palette, catalog.rgb, 3)
+                t_lut += t
+                (exact, _), t = _timed(match_palette, palette, catalog.rgb, 3, catalog.in_stock)
+                t_exact += t
+                top1 += approx[0] == exact[0]
+                top3 += len(set(approx) & set(exact))
+            n = len(palettes)
+            print(f"{rows:>6} {bits:>4} {t_build:>8.2f} {lut.nbytes / 2**20:>7.1f} "
+                  f"{t_lut / n * 1e6:>7.0f} {t_exact / n * 1e6:>9.0f} "
+                  f"{100 * top1 / n:>8.1f} {100 * top3 / (3 * n):>8.1f}")
+
+
+def measure(fn, repeat):
+    """p50/p95 milliseconds of repeated calls and peak traced memory (MB)
+
+    Peak memory comes from tracemalloc, which sees Python and NumPy
+    allocations; Pillow's image buffers are not included (see the process
+    peak RSS printed at the end of the suite).
+    """
+    fn()  # warm up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    # Traced separately, tracemalloc slows the calls down
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'p50': float(np.percentile(times, 50)), 'p95': float(np.percentile(times, 95)),
+            'peak_mb': peak / 2**20}
+
+
+def suite_images(args):
+    """(label, encoded bytes) for synthetic sizes plus any fixture images"""
+    for mp in args.sizes:
+        yield f'synthetic {mp:g} MP', synthetic_photo(mp)
+    if args.images:
+        for name in sorted(os.listdir(args.images)):
+            if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                with open(os.path.join(args.images, name), 'rb') as f:
+                    yield name, f.read()
+
+
+def bench_suite(args):
+    """Per-stage latency (p50/p95) and peak memory, optionally against a baseline"""
+    results = {}
+    catalog = Catalog.from_csv(args.catalog)
+
+    def record(name, fn, repeat=args.repeat):
+        results[name] = stats = measure(fn, repeat)
+        print(f"{name:<40} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['peak_mb']:>8.1f}",
+              flush=True)
+
+    print(f"{'stage':<40} {'p50 ms':>9} {'p95 ms':>9} {'peak MB':>8}")
+    for label, data in suite_images(args):
+        image = decode_image(data)
+        record(f'decode [{label}]', lambda: decode_image(data).load())
+        record(f'sample+quantize [{label}]',
+               lambda: mmcq.quantize(sample_pixels(image, sample_stride(image.width * image.height)), 5))
+        record(f'results path [{label}]',
+               lambda: render.results_html(analyze(data, catalog)))
+    palette = np.random.default_rng(1).integers(0, 256, (5, 3)).tolist()
+    for rows in args.rows:
+        shades = synthetic_catalog(rows)
+        for metric in METRICS:
+            record(f'match [{rows} rows, {metric}]',
+                   lambda: shades.best_matches(palette, metric=metric))
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"process peak RSS {peak_rss:.0f} MB")
+
+    if args.compare:
+        compare_baseline(results, args.compare, args.tolerance)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"saved baseline to {args.save}")
+
+
+def compare_baseline(results, path, tolerance):
+    """Print p50 changes against a saved baseline and flag regressions"""
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    print(f"\n{'stage':<40} {'base p50':>9} {'now p50':>9} {'change':>8}")
+    regressions = 0
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]['p50'], stats['p50']
+        change = now / before - 1 if before else 0.0
+        flag = '  REGRESSION' if change > tolerance else ''
+        regressions += bool(flag)
+        print(f"{name:<40} {before:>9.2f} {now:>9.2f} {change:>+8.0%}{flag}")
+    print(f"{regressions} stage(s) slower than the baseline by more than {tolerance:.0%}")
+
+
+_MEMORY_CHILD = """
+import json, resource, sys
+import extract
+
+def peak_kb():
+    # ru_maxrss survives exec on Linux and would include the parent's
+    # peak; VmHWM belongs to this process image only
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+data = open(sys.argv[1], 'rb').read()
+before = peak_kb()
+try:
+    extract.extract_colors(data)
+    outcome = 'ok'
+except extract.ImageTooLarge:
+    outcome = 'rejected'
+print(json.dumps({'outcome': outcome, 'peak_kb': peak_kb() - before}))
+"""
+
+
+# Uploads around MAX_DECODE_PIXELS: label, builder of the encoded bytes
+# (given the side of a square image at the limit) and expected outcome
+_MEMORY_CASES = [
+    ('PNG just under the limit', lambda side: synthetic_png(side, side), 'ok'),
+    ('PNG at 4x the limit', lambda side: synthetic_png(2 * side, 2 * side), 'rejected'),
+    ('PNG bomb, 65535x65535', lambda side: synthetic_png(65535, 65535, rows=16), 'rejected'),
+    ('JPEG 48 MP (draft mode)', lambda side: synthetic_photo(48), 'ok'),
+]
+
+_PAYLOAD_CHILD = """
+import sys
+import bench
+
+with open(sys.argv[2], 'wb') as f:
+    f.write(bench.memory_payload(sys.argv[1]))
+"""
+
+
+def memory_cases():
+    """(label, expected outcome) of the uploads built by memory_payload()"""
+    return [(label, expected) for label, _, expected in _MEMORY_CASES]
+
+
+def memory_payload(label):
+    """Encoded bytes of the memory case called label"""
+    side = int(settings.MAX_DECODE_PIXELS ** 0.5)
+    return next(build for name, build, _ in _MEMORY_CASES if name == label)(side)
+
+
+def memory_bound_mb(slack_mb=64):
+    """Allowed peak RSS growth per upload: 4 bytes per decoded pixel plus slack"""
+    return 4 * settings.MAX_DECODE_PIXELS / 2**20 + slack_mb
+
+
+def upload_peak(label):
+    """(outcome, peak RSS growth in MB, upload MB) of extracting a memory case
+
+    The upload is built and extracted in two fresh interpreters, so
+    building it (a 48 MP JPEG needs several hundred MB) adds to neither
+    the caller nor the measured peak.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'upload')
+        subprocess.run([sys.executable, '-c', _PAYLOAD_CHILD, label, path], check=True, cwd=here)
+        result = json.loads(subprocess.run(
+            [sys.executable, '-c', _MEMORY_CHILD, path], capture_output=True, text=True,
+            check=True, cwd=here).stdout)
+        upload_mb = os.path.getsize(path) / 2**20
+    return result['outcome'], result['peak_kb'] / 1024, upload_mb
+
+
+def bench_memory(args):
+    """Peak RSS of analysing oversized uploads against the per-decode bound"""
+    bound_mb = memory_bound_mb(args.slack_mb)
+    print(f"limit {settings.MAX_DECODE_PIXELS:,} pixels, "
+          f"bound {bound_mb:.0f} MB of peak RSS growth per upload")
+    failures = 0
+    for label, expected in memory_cases():
+        outcome, peak_mb, upload_mb = upload_peak(label)
+        ok = outcome == expected and peak_mb <= bound_mb
+        failures += not ok
+        print(f"{label:<28} {upload_mb:>7.2f} MB in {outcome:>9} "
+              f"{peak_mb:>7.1f} MB peak{'' if ok else '  FAIL'}")
+    if failures:
+        sys.exit(1)
+
+
+def bench_concurrency(args):
+    """Throughput of concurrent uploads, extracting in-thread vs on the worker pool"""
+    catalog = Catalog.from_csv(args.catalog)
+    uploads = [synthetic_photo(args.megapixels, seed) for seed in range(args.uploads)]
+    print(f"{args.uploads} uploads at {args.megapixels} MP from {args.threads} threads")
+    for count in [0] + args.workers:
+        settings.WORKERS = count
+        with ThreadPoolExecutor(args.threads) as threads:
+            list(threads.map(lambda data: analyze(data, catalog), uploads[:args.threads]))  # warm up
+            start = time.perf_counter()
+            list(threads.map(lambda data: analyze(data, catalog), uploads))
+            elapsed = time.perf_counter() - start
+        workers.shutdown()
+        label = f'{count} workers' if count else 'in-thread'
+        print(f"{label:<12} {args.uploads / elapsed:>7.1f} uploads/s")
+
+
+# What app.py imports before the first upload (Streamlit itself aside)
+STARTUP_MODULES = ['assets', 'metrics', 'render', 'colormatch']
+# Must not be loaded until an image is analysed
+DEFERRED_MODULES = ['numpy', 'PIL', 'colorthief', 'pandas']
+# Time STARTUP_MODULES may take to import, in milliseconds
+STARTUP_BUDGET_MS = 50
+
+
+def startup_import_time():
+    """(seconds, names of all modules imported) for STARTUP_MODULES
+
+    Measured with python -X importtime in a fresh interpreter; interpreter
+    startup itself is not counted.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(STARTUP_MODULES)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)))
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        if name.strip() in STARTUP_MODULES and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6, modules
+
+
+def bench_importtime(args):
+    """Startup import cost of the app against a time budget"""
+    total = min(startup_import_time()[0] for _ in range(args.runs))
+    _, modules = startup_import_time()
+    early = [m for m in DEFERRED_MODULES if m in modules]
+    print(f"startup imports ({', '.join(STARTUP_MODULES)}): {total * 1000:.1f} ms, "
+          f"budget {args.budget_ms} ms")
+    if early:
+        print(f"FAIL: imported before the first upload: {', '.join(early)}")
+    if total * 1000 > args.budget_ms:
+        print("FAIL: over budget")
+    if early or total * 1000 > args.budget_ms:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--catalog', default='hijab_catalog.csv')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('decode', help=bench_decode.__doc__)
+    p.add_argument('--sizes', type=float, nargs='+', default=[0.3, 2, 12])
+    p.set_defaults(func=bench_decode)
+
+    p = sub.add_parser('quantize', help=bench_quantize.__doc__)
+    p.add_argument('--images', type=int, default=20)
+    p.add_argument('--megapixels', type=float, default=2)
+    p.set_defaults(func=bench_quantize)
+
+    p = sub.add_parser('match', help=bench_match.__doc__)
+    p.add_argument('--rows', type=int, nargs='+', default=[43, 1000, 10000, 100000])
+    p.set_defaults(func=bench_match)
+
+    p = sub.add_parser('catalog', help=bench_catalog.__doc__)
+    p.add_argument('--rows', type=int, nargs='+', default=[43, 10000, 100000])
+    p.set_defaults(func=bench_catalog)
+
+    p = sub.add_parser('lut', help=bench_lut.__doc__)
+    p.add_argument('--rows', type=int, nargs='+', default=[43, 1000])
+    p.add_argument('--bits', type=int, nargs='+', default=[5, 6])
+    p.add_argument('--palettes', type=int, default=500)
+    p.set_defaults(func=bench_lut)
+
+    p = sub.add_parser('roi', help=bench_roi.__doc__)
+    p.add_argument('--images', type=int, default=20)
+    p.add_argument('--megapixels', type=float, default=2)
+    p.set_defaults(func=bench_roi)
+
+    p = sub.add_parser('concurrency', help=bench_concurrency.__doc__)
+    p.add_argument('--uploads', type=int, default=48)
+    p.add_argument('--megapixels', type=float, default=12)
+    p.add_argument('--threads', type=int, default=8)
+    p.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count() or 1])
+    p.set_defaults(func=bench_concurrency)
+
+    p = sub.add_parser('importtime', help=bench_importtime.__doc__)
+    p.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    p.add_argument('--runs', type=int, default=5)
+    p.set_defaults(func=bench_importtime)
+
+    p = sub.add_parser('memory', help=bench_memory.__doc__)
+    p.add_argument('--slack-mb', type=float, default=64,
+                   help='allowance over 4 bytes per pixel for the interpreter and copies')
+    p.set_defaults(func=bench_memory)
+
+    p = sub.add_parser('suite', help=bench_suite.__doc__)
+    p.add_argument('--sizes', type=float, nargs='+', default=[0.3, 2, 12, 48],
+                   help='synthetic image sizes in megapixels')
+    p.add_argument('--images', help='directory of fixture photos to include')
+    p.add_argument('--rows', type=int, nargs='+', default=[43, 1000, 10000, 100000],
+                   help='synthetic catalog sizes')
+    p.add_argument('--repeat', type=int, default=10)
+    p.add_argument('--save', help='write results to this baseline file')
+    p.add_argument('--compare', help='baseline file to compare against')
+    p.add_argument('--tolerance', type=float, default=0.2,
+                   help='p50 slowdown reported as a regression (0.2 = 20%%)')
+    p.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
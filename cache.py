@@ -0,0 +1,79 @@
+"""Small thread-safe LRU cache shared by all sessions of a process"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Mapping with at most max_entries items, least recently used evicted first
+
+    With max_bytes, items are also evicted while the sizes given to put()
+    add up to more than that (the newest item is always kept). on_evict
+    is called with (key, value) for every evicted item.
+    """
+
+    def __init__(self, max_entries, max_bytes=0, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value, nbytes=0):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self.nbytes += nbytes - self._sizes.get(key, 0)
+            self._sizes[key] = nbytes
+            self._evict()
+
+    def resize(self, key, nbytes):
+        """Record a new size for key, if held, without changing its recency"""
+        with self._lock:
+            if key not in self._items:
+                return
+            self.nbytes += nbytes - self._sizes[key]
+            self._sizes[key] = nbytes
+            self._evict()
+
+    def _evict(self):
+        while len(self._items) > self.max_entries or (
+                self.max_bytes and self.nbytes > self.max_bytes and len(self._items) > 1):
+            old_key, old_value = self._items.popitem(last=False)
+            self.nbytes -= self._sizes.pop(old_key)
+            if self.on_evict is not None:
+                self.on_evict(old_key, old_value)
+
+    def items(self):
+        """(key, value) pairs, least recently used first, without touching recency"""
+        with self._lock:
+            return list(self._items.items())
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._items), 'max_entries': self.max_entries,
+                'bytes': self.nbytes}
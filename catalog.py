@@ -0,0 +1,485 @@
+"""Compiled, read-only hijab catalog
+
+    python catalog.py hijab_catalog.csv [-o hijab_catalog.bin]
+
+compiles a catalog CSV into the binary format read by Catalog.open: the
+columns are stored as arrays (uint8 RGB, float64 Lab, int32 stock) plus
+a UTF-8 string table for names, hexes and URLs, and are opened with
+mmap, so every process using the file shares one page-cache copy.
+"""
+import argparse
+import csv
+import functools
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+from collections.abc import Sequence
+
+import numpy as np
+
+import settings
+from cache import LRUCache
+from colorindex import ColorIndex
+from colormatch import hex_to_rgb
+from colorlut import ColorLUT
+from matcher import match_palette, srgb_to_lab
+
+log = logging.getLogger(__name__)
+
+
+class Shade:
+    """One catalog row"""
+    __slots__ = ('name', 'hex', 'stock', 'url')
+
+    def __init__(self, name, hex, stock, url):
+        self.name = name
+        self.hex = hex
+        self.stock = stock
+        self.url = url
+
+    def __repr__(self):
+        return f"Shade({self.name!r}, {self.hex!r}, stock={self.stock})"
+
+
+def _content_hash(*columns):
+    h = hashlib.blake2b(digest_size=8)
+    for column in columns:
+        h.update(repr(column).encode())
+    return h.hexdigest()
+
+
+def _lookup_table(rgb, in_stock, version, path=None):
+    """ColorLUT over the in-stock rows, loaded from path when still current"""
+    rows = np.flatnonzero(in_stock)
+    if not len(rows):
+        rows = np.arange(len(rgb))
+    bits, k = settings.LUT_BITS, min(settings.LUT_K, len(rows))
+    if path:
+        lut = ColorLUT.load(path, version, bits, k)
+        if lut is not None:
+            return lut
+    lut = ColorLUT.build(rgb[rows], rows, bits, k, version)
+    if path:
+        try:
+            lut.save(path)
+        except OSError:
+            pass  # read-only deploy; the table is rebuilt on the next start
+    return lut
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+class StringTable(Sequence):
+    """Read-only sequence of strings stored as one UTF-8 blob plus offsets
+
+    Strings are decoded when accessed, so opening a large compiled
+    catalog does not create a Python object per row.
+    """
+    __slots__ = ('offsets', 'blob')
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @staticmethod
+    def pack(strings):
+        """(offsets, blob) arrays for a sequence of strings"""
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError('string table index out of range')
+        i %= len(self)
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes().decode('utf-8')
+
+    def __eq__(self, other):
+        if isinstance(other, StringTable):
+            return (np.array_equal(self.offsets, other.offsets)
+                    and np.array_equal(self.blob, other.blob))
+        return tuple(self) == tuple(other)
+
+    __hash__ = None
+
+
+# Compiled catalog layout: magic, offset of a JSON header at the end of the
+# file, then 64-byte aligned arrays described by the header
+_MAGIC = b'CMCATv1\n'
+_ALIGN = 64
+
+
+def _lut_path(path):
+    return os.path.splitext(path)[0] + '.lut.npz' if settings.LUT_PERSIST else None
+
+
+def read_binary(path):
+    """{name: array} of a compiled catalog and its header, as read-only mmap views"""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f'{path} is not a compiled catalog')
+    header_offset = int.from_bytes(mm[8:16], 'little')
+    header = json.loads(mm[header_offset:])
+    arrays = {}
+    for name, (offset, dtype, shape) in header['arrays'].items():
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(mm, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return arrays, header
+
+
+def read_csv(path):
+    """(names, hexes, stock, urls) columns of a catalog CSV"""
+    names, hexes, stock, urls = [], [], [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            names.append(row['name'])
+            hexes.append(row['hex'])
+            stock.append(int(row['stock']))
+            urls.append(row['url'])
+    return names, hexes, stock, urls
+
+
+class Catalog:
+    """Catalog packed into arrays once at load time
+
+    Nothing here is modified after construction, so one instance can be
+    shared by every session. Per-request code only reads from it.
+    lab holds the CIELAB coordinates used by the ciede2000 metric and
+    version is a hash of the contents, used to key cached results. Large
+    catalogs also get spatial indexes over all rows and over in-stock rows
+    for redmean queries; small ones are faster to scan. With
+    COLORMATCH_LUT_BITS set, redmean queries are answered from a
+    precomputed lookup table instead (cached at lut_path if given).
+    """
+    __slots__ = ('names', 'hexes', 'urls', 'rgb', 'lab', 'stock', 'in_stock', 'version',
+                 'index', 'in_stock_index', 'lut', 'lut_path')
+
+    def __init__(self, names, hexes, stock, urls, lut_path=None):
+        self.names = tuple(names)
+        self.hexes = tuple(hexes)
+        self.urls = tuple(urls)
+        self.rgb = _readonly(np.array([hex_to_rgb(h) for h in self.hexes],
+                                      dtype=np.uint8).reshape(-1, 3))
+        self.lab = _readonly(srgb_to_lab(self.rgb))
+        self.lut_path = lut_path
+        self._build_index()
+        self._set_stock(stock)
+
+    def _build_index(self):
+        self.index = None
+        if len(self.names) >= settings.INDEX_MIN_ROWS:
+            self.index = ColorIndex(self.rgb)
+
+    def _set_stock(self, stock, previous=None, version=None):
+        """Stock arrays and everything derived from them
+
+        Structures that only depend on which rows are in stock are reused
+        from previous when that set has not changed. version is computed
+        from the contents unless given (compiled catalogs store it).
+        """
+        self.stock = _readonly(np.array(stock, dtype=np.int32))
+        self.in_stock = _readonly(self.stock > 0)
+        if version is None:
+            version = _content_hash(tuple(self.names), tuple(self.hexes),
+                                    self.stock.tolist(), tuple(self.urls))
+        self.version = version
+        if previous is not None and np.array_equal(self.in_stock, previous.in_stock):
+            self.in_stock_index = previous.in_stock_index
+            self.lut = previous.lut
+            return
+
+        self.in_stock_index = None
+        if self.index is not None:
+            rows = np.flatnonzero(self.in_stock)
+            self.in_stock_index = ColorIndex(self.rgb[rows], rows)
+        self.lut = None
+        if settings.LUT_BITS and len(self.names):
+            # The table only depends on colours and the in-stock set
+            key = _content_hash(tuple(self.hexes), self.in_stock.tolist())
+            self.lut = _lookup_table(self.rgb, self.in_stock, key, self.lut_path)
+
+    def with_stock(self, stock, version=None):
+        """Copy with new stock counts, reusing the colour data and indexes"""
+        new = Catalog.__new__(Catalog)
+        for name in ('names', 'hexes', 'urls', 'rgb', 'lab', 'index', 'lut_path'):
+            setattr(new, name, getattr(self, name))
+        new._set_stock(stock, previous=self, version=version)
+        return new
+
+    @classmethod
+    def from_csv(cls, path):
+        """Compile a catalog CSV with name, hex, stock and url columns"""
+        return cls(*read_csv(path), lut_path=_lut_path(path))
+
+    @classmethod
+    def from_arrays(cls, arrays, version, lut_path=None):
+        """Catalog over the arrays of a compiled file (see read_binary)"""
+        self = cls.__new__(cls)
+        self.names = StringTable(arrays['names_offsets'], arrays['names_blob'])
+        self.hexes = StringTable(arrays['hexes_offsets'], arrays['hexes_blob'])
+        self.urls = StringTable(arrays['urls_offsets'], arrays['urls_blob'])
+        self.rgb = arrays['rgb']
+        self.lab = arrays['lab']
+        self.lut_path = lut_path
+        self._build_index()
+        self._set_stock(arrays['stock'], version=version)
+        return self
+
+    @classmethod
+    def open(cls, path):
+        """Open a compiled catalog written by save()
+
+        The colour arrays and string table are views of a read-only mmap
+        of the file, shared with every other process that opens it.
+        """
+        arrays, header = read_binary(path)
+        return cls.from_arrays(arrays, header['version'], lut_path=_lut_path(path))
+
+    def save(self, path):
+        """Write the catalog in the compiled format read by open()"""
+        columns = {'rgb': self.rgb, 'lab': self.lab, 'stock': self.stock}
+        for name in ('names', 'hexes', 'urls'):
+            columns[f'{name}_offsets'], columns[f'{name}_blob'] = StringTable.pack(getattr(self, name))
+        header = {'rows': len(self), 'version': self.version, 'arrays': {}}
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_MAGIC + bytes(8))
+            for name, array in columns.items():
+                array = np.ascontiguousarray(array)
+                f.write(bytes(-f.tell() % _ALIGN))
+                header['arrays'][name] = [f.tell(), array.dtype.str, list(array.shape)]
+                f.write(array.tobytes())
+            header_offset = f.tell()
+            f.write(json.dumps(header).encode())
+            f.seek(len(_MAGIC))
+            f.write(header_offset.to_bytes(8, 'little'))
+        os.replace(tmp, path)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the columns, indexes and lookup table"""
+        total = sum(a.nbytes for a in (self.rgb, self.lab, self.stock, self.in_stock))
+        for strings in (self.names, self.hexes, self.urls):
+            if isinstance(strings, StringTable):
+                total += strings.offsets.nbytes + strings.blob.nbytes
+            else:
+                total += sum(sys.getsizeof(s) for s in strings)
+        for structure in (self.index, self.in_stock_index, self.lut):
+            if structure is not None:
+                total += structure.nbytes
+        return total
+
+    def __getitem__(self, i):
+        return Shade(self.names[i], self.hexes[i], int(self.stock[i]), self.urls[i])
+
+    def best_matches(self, palette, k=3, metric=None):
+        """Top k shades for a palette, preferring in-stock colors"""
+        metric = metric or settings.MATCH_METRIC
+        if metric == 'redmean' and self.lut is not None and k <= self.lut.k:
+            indices, _ = self.lut.query(palette, self.rgb, k)
+        elif metric == 'redmean' and self.index is not None:
+            index = self.in_stock_index if len(self.in_stock_index) else self.index
+            indices, _ = index.query(palette, k)
+        else:
+            indices, _ = match_palette(palette, self.rgb, k=k, mask=self.in_stock,
+                                       metric=metric, catalog_lab=self.lab)
+        return [self[i] for i in indices]
+
+
+def open_catalog(path):
+    """Catalog from a CSV file, or from a compiled file for any other extension"""
+    if path.lower().endswith('.csv'):
+        return Catalog.from_csv(path)
+    return Catalog.open(path)
+
+
+class CatalogWatcher:
+    """Current Catalog for a CSV or compiled file, reloaded when it changes
+
+    A background thread polls the file's mtime and size every
+    poll_interval seconds (0 disables it; check() can also be called
+    directly). A changed file is compiled off to the side and swapped in
+    with a single assignment, so callers that already hold a Catalog keep
+    using that version. When only stock counts changed, the colour data
+    and indexes are reused (Catalog.with_stock). on_reload is called
+    with each newly installed Catalog.
+    """
+
+    def __init__(self, path, poll_interval=None, on_reload=None):
+        if poll_interval is None:
+            poll_interval = settings.CATALOG_POLL_SECONDS
+        self.path = path
+        self.poll_interval = poll_interval
+        self.on_reload = on_reload
+        self.reloads = 0
+        self._stat = self._file_stat()
+        self.catalog = open_catalog(path)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        if poll_interval > 0:
+            threading.Thread(target=self._poll, name='catalog-watcher', daemon=True).start()
+
+    def _file_stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def current(self):
+        return self.catalog
+
+    def check(self):
+        """Reload the catalog if the file changed; True if a new one was installed"""
+        with self._lock:
+            stat = self._file_stat()
+            if stat == self._stat:
+                return False
+            old = self.catalog
+            if self.path.lower().endswith('.csv'):
+                names, hexes, stock, urls = read_csv(self.path)
+                names, hexes, urls = tuple(names), tuple(hexes), tuple(urls)
+                version = None
+            else:
+                # Compiled files are replaced atomically, never rewritten in place
+                arrays, header = read_binary(self.path)
+                names, hexes, urls = (StringTable(arrays[f'{c}_offsets'], arrays[f'{c}_blob'])
+                                      for c in ('names', 'hexes', 'urls'))
+                stock, version = arrays['stock'], header['version']
+                if version == old.version:
+                    self._stat = stat
+                    return False
+            if self._file_stat() != stat:
+                return False  # still being written; try again on the next poll
+            self._stat = stat
+
+            if (names, hexes, urls) == (old.names, old.hexes, old.urls):
+                if np.array_equal(stock, old.stock):
+                    return False
+                new = old.with_stock(stock, version)
+            elif version is None:
+                new = Catalog(names, hexes, stock, urls, lut_path=old.lut_path)
+            else:
+                new = Catalog.from_arrays(arrays, version, lut_path=old.lut_path)
+            self.catalog = new
+            self.reloads += 1
+        log.info('reloaded %s (version %s)', self.path, new.version)
+        if self.on_reload is not None:
+            self.on_reload(new)
+        return True
+
+    def _poll(self):
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception:
+                log.exception('failed to reload %s, keeping version %s',
+                              self.path, self.catalog.version)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def catalog_paths(specs):
+    """{name: path} for 'name=path' entries; a bare path is named after its file"""
+    paths = {}
+    for spec in specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+        name, sep, path = spec.partition('=')
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(spec))[0], spec
+        paths[name.strip()] = path.strip()
+    return paths
+
+
+class CatalogRegistry:
+    """Named catalogs, loaded on first use and shared by every session
+
+    Each catalog gets a CatalogWatcher (so it reloads when its file
+    changes) the first time it is asked for. Loaded catalogs are held in
+    an LRU cache bounded by max_bytes of Catalog.nbytes; evicted ones stop
+    being watched and are loaded again when next used, and a reload
+    updates the size a catalog counts for. Callers that hold a Catalog
+    keep it regardless. Every Catalog carries its own content version,
+    which keys cached results.
+    """
+
+    def __init__(self, paths, max_bytes=None, poll_interval=None):
+        if not paths:
+            raise ValueError('no catalogs configured')
+        if max_bytes is None:
+            max_bytes = settings.CATALOG_CACHE_MB * 2**20
+        self.paths = dict(paths)
+        self.default = next(iter(self.paths))
+        self.poll_interval = poll_interval
+        self.loads = 0
+        self._watchers = LRUCache(len(self.paths), max_bytes,
+                                  on_evict=lambda name, watcher: watcher.stop())
+        self._loading = {name: threading.Lock() for name in self.paths}
+
+    @classmethod
+    def from_specs(cls, specs, **kwargs):
+        return cls(catalog_paths(specs), **kwargs)
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def get(self, name=None):
+        """Current Catalog called name (default: the first); KeyError if unknown"""
+        name = name or self.default
+        if name not in self.paths:
+            raise KeyError(name)
+        watcher = self._watchers.get(name)
+        if watcher is None:
+            # One load per catalog at a time; other catalogs are not blocked
+            with self._loading[name]:
+                watcher = self._watchers.get(name)
+                if watcher is None:
+                    watcher = CatalogWatcher(self.paths[name], self.poll_interval,
+                                             on_reload=functools.partial(self._reloaded, name))
+                    self.loads += 1
+                    log.info('loaded catalog %s from %s (%d shades)',
+                             name, self.paths[name], len(watcher.current()))
+                    self._watchers.put(name, watcher, watcher.current().nbytes)
+        return watcher.current()
+
+    def _reloaded(self, name, catalog):
+        self._watchers.resize(name, catalog.nbytes)
+
+    def loaded(self):
+        """{name: version} of the catalogs currently held"""
+        return {name: watcher.current().version for name, watcher in self._watchers.items()}
+
+    def stats(self):
+        return {'loaded': len(self._watchers), 'bytes': self._watchers.nbytes,
+                'max_bytes': self._watchers.max_bytes, 'loads': self.loads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a catalog CSV for Catalog.open')
+    parser.add_argument('csv', help='catalog CSV with name, hex, stock and url columns')
+    parser.add_argument('-o', '--output', help='compiled file (default: the CSV path with .bin)')
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.csv)[0] + '.bin'
+    catalog = Catalog.from_csv(args.csv)
+    catalog.save(output)
+    print(f"{len(catalog)} shades, version {catalog.version} -> {output} "
+          f"({os.path.getsize(output):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
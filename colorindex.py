@@ -0,0 +1,121 @@
+"""Spatial index over catalog colours for nearest-match queries
+
+The RGB cube is split into a uniform grid of cells and rows are stored
+sorted by cell. A query scans cells in growing shells around the query
+colour and stops once no unvisited cell can hold a closer row, so only
+the neighbourhood of each palette colour is scored instead of the whole
+catalog.
+
+Redmean weights are at least 2, 4 and 2 on the squared R, G and B
+differences, so a row whose cell is more than r shells away is at least
+sqrt(2) * r * cell_width from the query. That bound makes the search
+exact: results are the same as scoring every row.
+"""
+import functools
+
+import numpy as np
+
+from matcher import redmean_distances
+
+# Target number of rows per grid cell
+ROWS_PER_CELL = 4
+_MIN_WEIGHT = np.sqrt(2)
+
+
+@functools.lru_cache(maxsize=None)
+def _ring_offsets(radius):
+    """Cell offsets at Chebyshev distance exactly radius
+
+    Computed on first use and shared by all indexes; outer shells are
+    rarely visited.
+    """
+    span = np.arange(-radius, radius + 1)
+    grid = np.stack(np.meshgrid(span, span, span, indexing='ij'), axis=-1).reshape(-1, 3)
+    ring = grid[np.abs(grid).max(axis=1) == radius]
+    ring.flags.writeable = False
+    return ring
+
+
+class ColorIndex:
+    """Grid index over an (n, 3) uint8 RGB array
+
+    rows maps index positions back to catalog row numbers, so an index
+    can cover a subset of the catalog (e.g. only in-stock shades).
+    """
+
+    def __init__(self, rgb, rows=None):
+        rgb = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+        if rows is None:
+            rows = np.arange(len(rgb))
+        self.size = max(1, min(32, round((len(rgb) / ROWS_PER_CELL) ** (1 / 3))))
+        self.cell_width = 256 / self.size
+
+        cells = self._cells(rgb)
+        cell_ids = np.ravel_multi_index(cells.T, (self.size,) * 3)
+        order = np.argsort(cell_ids, kind='stable')
+        self.rgb = rgb[order]
+        self.rows = np.asarray(rows)[order]
+        counts = np.bincount(cell_ids, minlength=self.size ** 3)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+
+        for array in (self.rgb, self.rows, self.starts):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        return self.rgb.nbytes + self.rows.nbytes + self.starts.nbytes
+
+    def _cells(self, rgb):
+        return (np.asarray(rgb, dtype=np.intp) * self.size) // 256
+
+    def _ring_positions(self, cell, radius):
+        """Index positions of all rows in the cells of one shell"""
+        cells = cell + _ring_offsets(radius)
+        cells = cells[((cells >= 0) & (cells < self.size)).all(axis=1)]
+        ids = np.ravel_multi_index(cells.T, (self.size,) * 3)
+        starts, ends = self.starts[ids], self.starts[ids + 1]
+        lengths = ends - starts
+        keep = lengths > 0
+        starts, lengths = starts[keep], lengths[keep]
+        if not len(starts):
+            return np.empty(0, dtype=np.intp)
+        # Concatenated ranges starts[i]:starts[i] + lengths[i]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+    def nearest(self, color, k):
+        """Index positions of the k nearest rows to one colour, ties included"""
+        cell = self._cells(color)
+        found = []
+        distances = []
+        for radius in range(self.size):
+            positions = self._ring_positions(cell, radius)
+            if len(positions):
+                found.append(positions)
+                distances.append(redmean_distances([color], self.rgb[positions])[0])
+            n = sum(len(p) for p in found)
+            if n >= k:
+                d = np.concatenate(distances)
+                kth = np.partition(d, k - 1)[k - 1]
+                # Rows outside the visited shells are at least this far away
+                if kth < _MIN_WEIGHT * radius * self.cell_width:
+                    return np.concatenate(found)[d <= kth]
+        return np.arange(len(self.rows))
+
+    def query(self, palette, k=3):
+        """Best k catalog rows for a palette, as (rows, distances)
+
+        Same result as matcher.match_palette with the redmean metric over
+        the indexed rows.
+        """
+        if not len(self.rows):
+            return self.rows[:0], np.empty(0)
+        k = min(k, len(self.rows))
+        candidates = np.unique(np.concatenate([self.nearest(c, k) for c in palette]))
+        distance = redmean_distances(palette, self.rgb[candidates]).min(axis=0)
+        # Order by distance, then catalog row, like matcher.top_k
+        order = np.lexsort((self.rows[candidates], distance))[:k]
+        return self.rows[candidates[order]], distance[order]
@@ -0,0 +1,107 @@
+"""Precomputed RGB lookup table of nearest catalog rows
+
+Each channel is quantized to `bits` bits and every bin stores the k
+catalog rows closest (redmean) to the bin centre. Matching a palette is
+one table lookup per colour, then the few candidates found are ranked by
+their distance to the actual palette colours; no catalog-sized distance
+maths happens at query time. Results are approximate: a row can be
+missed when it is close to the query but not among the k nearest to the
+bin centre (see bench.py lut for accuracy against exact matching).
+"""
+import os
+
+import numpy as np
+
+from matcher import redmean_distances
+
+# Upper bound on (bins x catalog rows) distances computed at once while building
+_BUILD_CHUNK = 4_000_000
+
+
+def _squared_redmean(points, catalog):
+    """Squared redmean distances in float32; same ordering as redmean_distances"""
+    r_mean = (points[:, None, 0] + catalog[None, :, 0]) / 2
+    delta = points[:, None, :] - catalog[None, :, :]
+    delta *= delta
+    return ((2 + r_mean / 256) * delta[..., 0] + 4 * delta[..., 1]
+            + (2 + (255 - r_mean) / 256) * delta[..., 2])
+
+
+class ColorLUT:
+    """Top-k table over a (n, 3) uint8 RGB array
+
+    rows maps table entries back to catalog row numbers, as in
+    colorindex.ColorIndex.
+    """
+
+    def __init__(self, rows, bits, version=None):
+        self.rows = rows
+        self.bits = bits
+        self.k = rows.shape[1]
+        self.version = version
+
+    @classmethod
+    def build(cls, rgb, rows=None, bits=5, k=8, version=None):
+        rgb = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+        if rows is None:
+            rows = np.arange(len(rgb))
+        rows = np.asarray(rows)
+        k = min(k, len(rgb))
+        bins = 1 << bits
+        width = 256 / bins
+        centres = (np.arange(bins) + 0.5) * width - 0.5
+        grid = np.stack(np.meshgrid(centres, centres, centres, indexing='ij'),
+                        axis=-1).reshape(-1, 3).astype(np.float32)
+
+        catalog = rgb.astype(np.float32)
+        # Entries are catalog row numbers, which can exceed len(rgb) for a subset
+        dtype = np.uint16 if not len(rows) or rows.max() < 1 << 16 else np.uint32
+        table = np.empty((len(grid), k), dtype=dtype)
+        chunk = max(1, _BUILD_CHUNK // max(1, len(rgb)))
+        for start in range(0, len(grid), chunk):
+            d = _squared_redmean(grid[start:start + chunk], catalog)
+            if k < len(rgb):
+                nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+            else:
+                nearest = np.broadcast_to(np.arange(len(rgb)), d.shape)
+            order = np.argsort(np.take_along_axis(d, nearest, axis=1), axis=1, kind='stable')
+            table[start:start + chunk] = rows[np.take_along_axis(nearest, order, axis=1)]
+        return cls(table, bits, version)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes
+
+    def candidates(self, palette):
+        """Catalog rows stored in the bins of the palette colours"""
+        bins = np.asarray(palette, dtype=np.intp).reshape(-1, 3) >> (8 - self.bits)
+        return np.unique(self.rows[np.ravel_multi_index(bins.T, (1 << self.bits,) * 3)])
+
+    def query(self, palette, catalog_rgb, k=3):
+        """Best k catalog rows for a palette, as (rows, distances)
+
+        catalog_rgb is the full catalog RGB array the table was built from.
+        """
+        rows = self.candidates(palette).astype(np.intp)
+        distance = redmean_distances(palette, catalog_rgb[rows]).min(axis=0)
+        order = np.lexsort((rows, distance))[:k]
+        return rows[order], distance[order]
+
+    def save(self, path):
+        """Write the table to an .npz file"""
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, rows=self.rows, bits=self.bits, version=str(self.version))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, version, bits, k):
+        """Table saved at path, or None if missing or built for other settings"""
+        try:
+            with np.load(path) as f:
+                if (str(f['version']) != str(version) or int(f['bits']) != bits
+                        or f['rows'].shape[1] != k):
+                    return None
+                return cls(f['rows'], bits, version)
+        except (OSError, KeyError, ValueError):
+            return None
@@ -0,0 +1,74 @@
+"""Colour matching core, importable without Streamlit
+
+The small colour helpers are defined here and need only the standard
+library. Everything else (extraction, matching, the compiled catalog)
+is re-exported lazily: NumPy and Pillow are imported the first time one
+of those names is used, not when this module is imported, so the app can
+serve its landing page before paying for them.
+
+    import colormatch
+    catalog = colormatch.Catalog.from_csv('hijab_catalog.csv')
+    result = colormatch.analyze(open('outfit.jpg', 'rb').read(), catalog)
+"""
+import importlib
+
+# Public name -> module it lives in, imported on first access
+_LAZY = {
+    'Analysis': 'analysis',
+    'analyze': 'analysis',
+    'cached_analyze': 'analysis',
+    'Catalog': 'catalog',
+    'CatalogWatcher': 'catalog',
+    'Shade': 'catalog',
+    'Colors': 'extract',
+    'decode_image': 'extract',
+    'extract_colors': 'extract',
+    'ImageTooLarge': 'extract',
+    'METRICS': 'matcher',
+    'match_palette': 'matcher',
+}
+
+__all__ = ['hex_to_rgb', 'rgb_to_hex', 'color_distance', *_LAZY]
+
+
+def hex_to_rgb(hexstr):
+    """Convert hex color to RGB tuple"""
+    h = hexstr.lstrip('#')
+    return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+
+
+def rgb_to_hex(rgb):
+    """Convert RGB tuple to hex color"""
+    return '#{:02x}{:02x}{:02x}'.format(*rgb)
+
+
+def color_distance(c1, c2):
+    """Calculate improved color distance using weighted RGB and perceptual differences
+
+    Reference version of the redmean distance for a single pair;
+    matcher.redmean_distances computes the same thing for whole arrays.
+    """
+    r1, g1, b1 = c1
+    r2, g2, b2 = c2
+
+    r_mean = (r1 + r2) / 2
+    delta_r = r1 - r2
+    delta_g = g1 - g2
+    delta_b = b1 - b2
+
+    distance = (2 + r_mean/256) * delta_r**2 + 4 * delta_g**2 + (2 + (255-r_mean)/256) * delta_b**2
+    return distance**0.5
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
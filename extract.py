@@ -0,0 +1,199 @@
+"""Colour extraction from uploaded images"""
+import io
+import math
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import metrics
+import mmcq
+import settings
+from matcher import redmean_distances
+
+
+class ImageTooLarge(ValueError):
+    """Image would need more than MAX_DECODE_PIXELS pixels to decode"""
+
+
+def decode_image(data, pixel_budget=None, max_pixels=None):
+    """Open an encoded image at no more than pixel_budget pixels
+
+    JPEGs are downscaled during decoding (draft mode), other formats are
+    reduced right after. data is decoded straight from memory, nothing is
+    written to disk. A falsy budget decodes at full resolution.
+
+    Only the header has been read when the size is checked: anything that
+    would still need more than max_pixels pixels after draft mode is
+    rejected with ImageTooLarge before the bitmap is allocated, which
+    bounds the memory one decode can take (and stops decompression bombs,
+    whose headers declare huge sizes). A falsy max_pixels disables this.
+    """
+    if pixel_budget is None:
+        pixel_budget = settings.PIXEL_BUDGET
+    if max_pixels is None:
+        max_pixels = settings.MAX_DECODE_PIXELS
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e)) from None
+    width, height = image.size
+    metrics.observe('image_pixels', width * height)
+    size = None
+    if pixel_budget and width * height > pixel_budget:
+        scale = math.sqrt(pixel_budget / (width * height))
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image.draft('RGB', size)
+    if max_pixels and image.width * image.height > max_pixels:
+        raise ImageTooLarge(f"image is {width}x{height} ({width * height:,} pixels), "
+                            f"the limit is {max_pixels:,}")
+    if size:
+        image.thumbnail(size)
+    image.load()
+    return image
+
+
+def sample_stride(pixel_count, sample_budget=None):
+    """Pixel stride that samples about sample_budget pixels"""
+    if sample_budget is None:
+        sample_budget = settings.SAMPLE_BUDGET
+    return max(1, math.ceil(pixel_count / sample_budget))
+
+
+def sample_pixels(image, stride):
+    """Every stride-th pixel that is mostly opaque and not white
+
+    Same sampling and filtering as ColorThief.get_palette, as an (n, 3)
+    uint8 array.
+    """
+    pixels = np.asarray(image.convert('RGBA')).reshape(-1, 4)[::stride]
+    opaque = pixels[:, 3] >= 125
+    white = (pixels[:, :3] > 250).all(axis=1)
+    return pixels[opaque & ~white, :3]
+
+
+# Pixels this close (redmean) to a border colour count as background
+BACKGROUND_DISTANCE = 60
+# Width of the border strip background colours are estimated from
+_BORDER = 0.05
+# Below this share of the sampled pixels the mask is ignored, e.g. for a
+# close-up where the garment fills the frame or is itself skin-toned
+_ROI_MIN_SHARE = 0.1
+
+
+def background_colors(rgba):
+    """Median colour of each side of the border of an (h, w, 4) array
+
+    Top, bottom, left and right: typically wall, floor and whatever is
+    beside the subject. Transparent pixels are ignored, and so are sides
+    with none left, so the result has up to four rows.
+    """
+    h, w = rgba.shape[:2]
+    dy, dx = max(1, int(h * _BORDER)), max(1, int(w * _BORDER))
+    colors = []
+    for side in (rgba[:dy], rgba[-dy:], rgba[:, :dx], rgba[:, -dx:]):
+        side = side.reshape(-1, 4)
+        side = side[side[:, 3] >= 125, :3]
+        if len(side):
+            colors.append(np.median(side, axis=0))
+    return np.array(colors).reshape(-1, 3)
+
+
+def skin_mask(pixels):
+    """True for (n, 3) RGB pixels in the usual skin-tone range
+
+    The uniform-daylight rule of Kovac et al. (2003): reddish, not grey
+    and not too dark.
+    """
+    p = pixels.astype(np.int16)
+    r, g, b = p[:, 0], p[:, 1], p[:, 2]
+    spread = p.max(axis=1) - p.min(axis=1)
+    return ((r > 95) & (g > 40) & (b > 20) & (spread > 15)
+            & (np.abs(r - g) > 15) & (r > g) & (r > b))
+
+
+def roi_pixels(image, stride=None, crop=None):
+    """Sampled garment pixels from the centre of the image
+
+    Same opacity and white filtering as sample_pixels, over a centre crop
+    covering crop of each side, then background- and skin-coloured
+    pixels are dropped. Falls back to the filtered crop when the mask
+    would leave too few pixels, and to sample_pixels over the whole
+    image when the crop has none (e.g. an all-white centre). stride
+    defaults to one that samples about SAMPLE_BUDGET pixels of the crop.
+    """
+    if crop is None:
+        crop = settings.ROI_CROP
+    rgba = np.asarray(image.convert('RGBA'))
+    h, w = rgba.shape[:2]
+    background = background_colors(rgba)
+    dy, dx = int(h * (1 - crop) / 2), int(w * (1 - crop) / 2)
+    centre = rgba[dy:h - dy, dx:w - dx].reshape(-1, 4)
+    if stride is None:
+        stride = sample_stride(len(centre))
+    pixels = centre[::stride]
+    pixels = pixels[(pixels[:, 3] >= 125) & ~(pixels[:, :3] > 250).all(axis=1), :3]
+    if not len(pixels):
+        return sample_pixels(image, sample_stride(image.width * image.height))
+
+    near_background = (redmean_distances(background, pixels) < BACKGROUND_DISTANCE).any(axis=0)
+    garment = ~near_background & ~skin_mask(pixels)
+    if garment.sum() < _ROI_MIN_SHARE * len(pixels):
+        return pixels
+    return pixels[garment]
+
+
+def preview_jpeg(image, width, quality=80):
+    """JPEG bytes of a copy of image at most width pixels wide
+
+    For showing the upload back to the user without sending the
+    original. EXIF orientation is applied (the re-encoded file carries no
+    EXIF) and transparency is flattened onto white. Never upscales.
+    """
+    preview = ImageOps.exif_transpose(image)
+    preview.thumbnail((width, width * 4))
+    if preview.mode in ('RGBA', 'LA', 'P'):
+        preview = preview.convert('RGBA')
+        flat = Image.new('RGB', preview.size, (255, 255, 255))
+        flat.paste(preview, mask=preview.getchannel('A'))
+        preview = flat
+    buf = io.BytesIO()
+    preview.convert('RGB').save(buf, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+# preview is only set when extract_colors is asked for one
+Colors = namedtuple('Colors', ['dominant', 'palette', 'populations', 'preview'],
+                    defaults=(None,))
+
+
+def extract_colors(data, color_count=5, quality=None, pixel_budget=None, roi=None,
+                   preview_width=None):
+    """Dominant colour, palette and swatch populations of an encoded image
+
+    Pixels are read and quantized once (see mmcq.py). The dominant colour
+    is the first swatch of the palette, which is what ColorThief.get_color
+    returns for the default 5-colour palette. quality is the sampling
+    stride; by default it is picked from the decoded pixel count. With
+    roi (default COLORMATCH_ROI) only garment pixels from the centre of
+    the photo are quantized (see roi_pixels). With preview_width, a
+    JPEG preview of that width is made from the same decode.
+    """
+    if roi is None:
+        roi = settings.ROI
+    with metrics.timer('decode'):
+        image = decode_image(data, pixel_budget)
+    with metrics.timer('sample'):
+        if roi:
+            pixels = roi_pixels(image, quality)
+        else:
+            if quality is None:
+                quality = sample_stride(image.width * image.height)
+            pixels = sample_pixels(image, quality)
+    with metrics.timer('quantize'):
+        palette, populations = mmcq.quantize(pixels, color_count)
+    preview = None
+    if preview_width:
+        with metrics.timer('preview'):
+            preview = preview_jpeg(image, preview_width)
+    return Colors(palette[0], palette, populations, preview)
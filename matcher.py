@@ -0,0 +1,125 @@
+"""Vectorized colour matching against the hijab catalog"""
+import numpy as np
+
+METRICS = ('redmean', 'ciede2000')
+
+_SRGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                         [0.2126729, 0.7151522, 0.0721750],
+                         [0.0193339, 0.1191920, 0.9503041]])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def redmean_distances(palette, catalog_rgb):
+    """Redmean distance matrix of shape (palette colours, catalog rows)
+
+    Same formula as colormatch.color_distance(), evaluated for every
+    (palette colour, catalog colour) pair in one broadcast.
+    """
+    p = np.asarray(palette, dtype=np.float64).reshape(-1, 1, 3)
+    c = np.asarray(catalog_rgb, dtype=np.float64).reshape(1, -1, 3)
+
+    r_mean = (p[..., 0] + c[..., 0]) / 2
+    delta = p - c
+    distance = ((2 + r_mean / 256) * delta[..., 0] ** 2
+                + 4 * delta[..., 1] ** 2
+                + (2 + (255 - r_mean) / 256) * delta[..., 2] ** 2)
+    return np.sqrt(distance)
+
+
+def top_k(distance, k, mask=None):
+    """Indices of the k smallest distances, closest first
+
+    When mask is given only those rows are considered, unless none of
+    them are set, in which case every row is (same fallback as the app
+    uses for an empty in-stock list).
+    """
+    distance = np.asarray(distance)
+    candidates = np.arange(len(distance))
+    if mask is not None and np.any(mask):
+        candidates = candidates[np.asarray(mask, dtype=bool)]
+
+    k = min(k, len(candidates))
+    if k <= 0:
+        return candidates[:0]
+    if k < len(candidates):
+        d = distance[candidates]
+        kth = d[np.argpartition(d, k - 1)[k - 1]]
+        # Keep everything tied with the k-th row so the cut below is stable
+        candidates = candidates[d <= kth]
+    # Ties are broken by catalog order so results are deterministic
+    order = np.lexsort((candidates, distance[candidates]))
+    return candidates[order[:k]]
+
+
+def match_palette(palette, catalog_rgb, k=3, mask=None, metric='redmean', catalog_lab=None):
+    """Best k catalog rows for a palette
+
+    Each catalog row is scored by its distance to the closest palette
+    colour, using the redmean approximation or CIEDE2000 (pass the
+    precomputed catalog_lab to avoid converting the catalog per call).
+    Returns (indices, distances) for the k best rows.
+    """
+    if metric == 'redmean':
+        distance = redmean_distances(palette, catalog_rgb)
+    elif metric == 'ciede2000':
+        if catalog_lab is None:
+            catalog_lab = srgb_to_lab(catalog_rgb)
+        distance = ciede2000_distances(srgb_to_lab(palette), catalog_lab)
+    else:
+        raise ValueError(f"unknown metric {metric!r}, expected one of {METRICS}")
+    distance = distance.min(axis=0)
+    indices = top_k(distance, k, mask)
+    return indices, distance[indices]
+
+
+def srgb_to_lab(rgb):
+    """CIELAB (D65) coordinates of 8-bit sRGB colours, shape (..., 3)"""
+    c = np.asarray(rgb, dtype=np.float64) / 255
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _SRGB_TO_XYZ.T / _D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def ciede2000_distances(palette_lab, catalog_lab):
+    """CIEDE2000 colour difference matrix of shape (palette colours, catalog rows)"""
+    lab1 = np.asarray(palette_lab, dtype=np.float64).reshape(-1, 1, 3)
+    lab2 = np.asarray(catalog_lab, dtype=np.float64).reshape(1, -1, 3)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_bar ** 7 / (c_bar ** 7 + 25.0 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    dL = L2 - L1
+    dC = c2p - c1p
+    dh = h2p - h1p
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(c1p * c2p == 0, 0, dh)
+    dH = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dh) / 2)
+
+    L_bar = (L1 + L2) / 2
+    cp_bar = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(np.abs(h1p - h2p) > 180,
+                     np.where(h_sum < 360, h_sum + 360, h_sum - 360), h_sum) / 2
+    h_bar = np.where(c1p * c2p == 0, h_sum, h_bar)
+
+    t = (1 - 0.17 * np.cos(np.radians(h_bar - 30))
+         + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6))
+         - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    s_L = 1 + 0.015 * (L_bar - 50) ** 2 / np.sqrt(20 + (L_bar - 50) ** 2)
+    s_C = 1 + 0.045 * cp_bar
+    s_H = 1 + 0.015 * cp_bar * t
+    r_T = (-2 * np.sqrt(cp_bar ** 7 / (cp_bar ** 7 + 25.0 ** 7))
+           * np.sin(np.radians(60 * np.exp(-((h_bar - 275) / 25) ** 2))))
+
+    return np.sqrt((dL / s_L) ** 2 + (dC / s_C) ** 2 + (dH / s_H) ** 2
+                   + r_T * (dC / s_C) * (dH / s_H))
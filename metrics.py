@@ -0,0 +1,207 @@
+"""Lightweight per-stage timing, exported in Prometheus text format
+
+Turned on with COLORMATCH_METRICS=1. When off, timer() hands back a
+shared no-op context manager and observe() returns immediately, so the
+instrumented code pays one attribute lookup and a call.
+
+    with metrics.timer('decode'):
+        ...
+    metrics.observe('upload_bytes', len(data))
+"""
+import bisect
+import contextlib
+import threading
+import time
+
+import settings
+
+enabled = settings.METRICS_ENABLED
+
+_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf if past the last)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record('stage_seconds', self.stage, time.perf_counter() - self.start)
+
+
+# name -> (help, buckets); stage timings are labelled by stage
+METRICS = {
+    'stage_seconds': ('Time spent in each stage of handling an upload', _SECONDS_BUCKETS),
+    'admission_wait_seconds': ('Time uploads waited for an analysis slot', _SECONDS_BUCKETS),
+    'upload_bytes': ('Size of uploaded images',
+                     (1e4, 1e5, 5e5, 1e6, 2e6, 5e6, 1e7, 2e7, 5e7)),
+    'image_pixels': ('Pixel count of uploaded images before any downscaling',
+                     (1e5, 3e5, 1e6, 2e6, 5e6, 1.2e7, 2.4e7, 4.8e7, 1e8)),
+}
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_collectors = []
+# Per-thread list of observations being captured by recording()
+_capture = threading.local()
+
+
+def _histogram(name, label=None):
+    key = (name, label)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(key, Histogram(METRICS[name][1]))
+    return histogram
+
+
+def _record(name, label, value):
+    _histogram(name, label).observe(value)
+    observations = getattr(_capture, 'observations', None)
+    if observations is not None:
+        observations.append((name, label, value))
+
+
+def timer(stage):
+    """Context manager recording the duration of one stage"""
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(stage)
+
+
+def observe(name, value):
+    """Record one value of an unlabelled metric (upload_bytes, image_pixels, ...)"""
+    if enabled:
+        _record(name, None, value)
+
+
+@contextlib.contextmanager
+def recording():
+    """Also collect this thread's observations as [(name, label, value)]
+
+    Used in worker processes, whose histograms are never exported: the
+    list goes back to the parent with the result and is passed to
+    replay() there.
+    """
+    _capture.observations = observations = []
+    try:
+        yield observations
+    finally:
+        _capture.observations = None
+
+
+def replay(observations):
+    """Record observations collected by recording() in another process"""
+    if enabled:
+        for name, label, value in observations:
+            _histogram(name, label).observe(value)
+
+
+def register_collector(collect):
+    """Add a callable returning [(name, type, help, value)] to every export
+
+    Used for values owned elsewhere, e.g. the result cache counters.
+    """
+    _collectors.append(collect)
+
+
+def snapshot():
+    """{(name, label): Histogram} of everything recorded so far"""
+    with _histograms_lock:
+        return dict(_histograms)
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    histograms = snapshot()
+    for name, (help_text, _) in METRICS.items():
+        series = [(label, h) for (n, label), h in sorted(histograms.items(), key=str) if n == name]
+        if not series:
+            continue
+        full_name = f'colormatch_{name}'
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} histogram')
+        for label, h in series:
+            labels = f'stage="{label}",' if label else ''
+            cumulative = 0
+            for bound, n in zip(h.buckets + (float('inf'),), h.counts):
+                cumulative += n
+                lines.append(f'{full_name}_bucket{{{labels}le="{_format_bound(bound)}"}} {cumulative}')
+            suffix = '{' + labels.rstrip(',') + '}' if labels else ''
+            lines.append(f'{full_name}_sum{suffix} {h.sum}')
+            lines.append(f'{full_name}_count{suffix} {h.count}')
+    for collect in _collectors:
+        for name, kind, help_text, value in collect():
+            full_name = f'colormatch_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            lines.append(f'{full_name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port=None, host='127.0.0.1'):
+    """Serve /metrics on a local port from a daemon thread"""
+    # Imported here so the app doesn't pay for http.server at startup
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            payload = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass  # scraped every few seconds; keep the app log quiet
+
+    if port is None:
+        port = settings.METRICS_PORT
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,182 @@
+"""NumPy port of ColorThief's modified median cut quantization (MMCQ)
+
+The algorithm, constants and tie-breaking follow colorthief.MMCQ so the
+palettes match ColorThief.get_palette. Pixels are histogrammed into 5-bit
+RGB bins with np.bincount, and box counts, cut positions and averages are
+computed with array sums over the histogram instead of per-bin loops.
+"""
+import numpy as np
+
+SIGBITS = 5
+RSHIFT = 8 - SIGBITS
+MAX_ITERATION = 1000
+FRACT_BY_POPULATIONS = 0.75
+
+_BINS = 1 << SIGBITS
+_MULT = 1 << RSHIFT
+# Bin centres in 8-bit units; avg() weights by these
+_CENTRES = np.arange(_BINS) * _MULT + _MULT // 2
+
+
+def get_histo(pixels):
+    """(32, 32, 32) pixel counts indexed by 5-bit r, g, b"""
+    shifted = (pixels >> RSHIFT).astype(np.intp)
+    index = (shifted[:, 0] << (2 * SIGBITS)) + (shifted[:, 1] << SIGBITS) + shifted[:, 2]
+    return np.bincount(index, minlength=_BINS ** 3).reshape(_BINS, _BINS, _BINS)
+
+
+class VBox:
+    """Box of histogram bins, lo[axis]..hi[axis] inclusive on each axis"""
+    __slots__ = ('lo', 'hi', 'histo', '_count')
+
+    def __init__(self, lo, hi, histo):
+        self.lo = list(lo)
+        self.hi = list(hi)
+        self.histo = histo
+        self._count = None
+
+    def copy(self):
+        return VBox(self.lo, self.hi, self.histo)
+
+    def region(self):
+        lo, hi = self.lo, self.hi
+        return self.histo[lo[0]:hi[0] + 1, lo[1]:hi[1] + 1, lo[2]:hi[2] + 1]
+
+    @property
+    def count(self):
+        if self._count is None:
+            self._count = int(self.region().sum())
+        return self._count
+
+    @property
+    def volume(self):
+        return ((self.hi[0] - self.lo[0] + 1) * (self.hi[1] - self.lo[1] + 1)
+                * (self.hi[2] - self.lo[2] + 1))
+
+    def avg(self):
+        """Population-weighted mean colour of the box"""
+        region = self.region()
+        total = int(region.sum())
+        if not total:
+            return tuple(int(_MULT * (lo + hi + 1) / 2) for lo, hi in zip(self.lo, self.hi))
+        colour = []
+        for axis in range(3):
+            others = tuple(a for a in range(3) if a != axis)
+            weights = _CENTRES[self.lo[axis]:self.hi[axis] + 1]
+            colour.append(int(int(region.sum(axis=others) @ weights) / total))
+        return tuple(colour)
+
+
+class _PQueue:
+    """Same ordering as colorthief.PQueue: lazily sorted, pops the largest"""
+
+    def __init__(self, sort_key):
+        self.sort_key = sort_key
+        self.contents = []
+        self._sorted = False
+
+    def push(self, o):
+        self.contents.append(o)
+        self._sorted = False
+
+    def pop(self):
+        if not self._sorted:
+            self.contents.sort(key=self.sort_key)
+            self._sorted = True
+        return self.contents.pop()
+
+    def __len__(self):
+        return len(self.contents)
+
+
+def median_cut_apply(vbox):
+    """Split a box at its population median along its widest axis"""
+    if not vbox.count:
+        return None, None
+    if vbox.count == 1:
+        return vbox.copy(), None
+
+    widths = [hi - lo + 1 for lo, hi in zip(vbox.lo, vbox.hi)]
+    axis = widths.index(max(widths))
+    others = tuple(a for a in range(3) if a != axis)
+    partial = np.cumsum(vbox.region().sum(axis=others)).tolist()
+    total = partial[-1]
+    lo, hi = vbox.lo[axis], vbox.hi[axis]
+
+    def partialsum(i):
+        return partial[i - lo] if lo <= i <= hi else 0
+
+    def lookaheadsum(i):
+        return total - partial[i - lo] if lo <= i <= hi else None
+
+    i = lo + int(np.argmax(np.array(partial) > total / 2))
+    left = i - lo
+    right = hi - i
+    if left <= right:
+        d2 = min(hi - 1, int(i + right / 2))
+    else:
+        d2 = max(lo, int(i - 1 - left / 2))
+    # avoid 0-count boxes
+    while not partialsum(d2):
+        d2 += 1
+    count2 = lookaheadsum(d2)
+    while not count2 and partialsum(d2 - 1):
+        d2 -= 1
+        count2 = lookaheadsum(d2)
+
+    vbox1 = vbox.copy()
+    vbox2 = vbox.copy()
+    vbox1.hi[axis] = d2
+    vbox2.lo[axis] = d2 + 1
+    return vbox1, vbox2
+
+
+def _iterate(queue, target):
+    n_color = 1
+    n_iter = 0
+    while n_iter < MAX_ITERATION:
+        vbox = queue.pop()
+        if not vbox.count:
+            queue.push(vbox)
+            n_iter += 1
+            continue
+        vbox1, vbox2 = median_cut_apply(vbox)
+        queue.push(vbox1)
+        if vbox2:
+            queue.push(vbox2)
+            n_color += 1
+        if n_color >= target:
+            return
+        n_iter += 1
+
+
+def quantize(pixels, max_color):
+    """Palette of at most max_color colours for an (n, 3) uint8 pixel array
+
+    Returns (palette, populations) in the same order as
+    ColorThief.get_palette.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    if not len(pixels):
+        raise ValueError('Empty pixels when quantize.')
+    if max_color < 2 or max_color > 256:
+        raise ValueError('Wrong number of max colors when quantize.')
+
+    histo = get_histo(pixels)
+    shifted = pixels >> RSHIFT
+    queue = _PQueue(lambda b: b.count)
+    queue.push(VBox(shifted.min(axis=0).tolist(), shifted.max(axis=0).tolist(), histo))
+
+    # first set of colors, sorted by population
+    _iterate(queue, FRACT_BY_POPULATIONS * max_color)
+
+    # then split by population times size in colour space
+    queue2 = _PQueue(lambda b: b.count * b.volume)
+    while len(queue):
+        queue2.push(queue.pop())
+    _iterate(queue2, max_color - len(queue2))
+
+    boxes = []
+    while len(queue2):
+        boxes.append(queue2.pop())
+    return [b.avg() for b in boxes], [b.count for b in boxes]
@@ -0,0 +1,51 @@
+"""HTML fragments for the results view, each emitted with one st.markdown call"""
+import functools
+import html
+
+import metrics
+from colormatch import rgb_to_hex
+
+_HEADING = '<h3 style="font-size: 1.1rem; font-weight: 600; margin-bottom: 0.75rem; color: #c59bd1;">{}</h3>'
+_SWATCH = '<div style="flex: 1; height: 50px; background: {}; border-radius: 8px; box-shadow: 0 2px 6px rgba(0,0,0,0.1);"></div>'
+_MATCH = (
+    '<div style="display: flex; align-items: center; gap: 0.75rem; padding: 0.75rem; background: #f8f9fa; border-radius: 8px; margin-bottom: 0.5rem;">'
+    '<div style="width: 50px; height: 50px; background: {hex}; border-radius: 6px; flex-shrink: 0; box-shadow: 0 2px 4px rgba(0,0,0,0.1);"></div>'
+    '<div style="flex: 1;">'
+    '<p style="font-weight: 600; margin: 0; color: #000; font-size: 0.95rem;">{name}</p>'
+    '<p style="color: #666; font-size: 0.85rem; margin: 0.25rem 0 0 0;">Stock: {stock}</p>'
+    '</div></div>'
+)
+
+
+def results_html(analysis):
+    """Detected colors and best matches panel for an Analysis"""
+    palette = tuple(tuple(c) for c in analysis.colors.palette)
+    matches = tuple((s.name, s.hex, s.stock) for s in analysis.matches)
+    return _results_html(palette, matches)
+
+
+@functools.lru_cache(maxsize=256)
+def _results_html(palette, matches):
+    parts = [_HEADING.format('Detected Colors'),
+             '<div style="display: flex; gap: 0.5rem; margin-bottom: 1.5rem;">']
+    parts.extend(_SWATCH.format(rgb_to_hex(c)) for c in palette)
+    parts.append('</div>')
+    parts.append(_HEADING.format('Best Matches'))
+    parts.extend(_MATCH.format(hex=html.escape(hex_), name=html.escape(name), stock=stock)
+                 for name, hex_, stock in matches)
+    return '<div>' + ''.join(parts) + '</div>'
+
+
+def metrics_markdown():
+    """Markdown table of the stage timings recorded by metrics.py"""
+    rows = ['| metric | count | mean | p50 ≤ | p95 ≤ |', '|---|---:|---:|---:|---:|']
+    for (name, label), h in sorted(metrics.snapshot().items(), key=str):
+        if not h.count:
+            continue
+        if name.endswith('_seconds'):
+            title, scale, unit = label or name, 1000, ' ms'
+        else:
+            title, scale, unit = name, 1, ''
+        rows.append(f'| {title} | {h.count} | {h.sum / h.count * scale:,.1f}{unit} | '
+                    f'{h.quantile(0.5) * scale:,.4g}{unit} | {h.quantile(0.95) * scale:,.4g}{unit} |')
+    return '\n'.join(rows)
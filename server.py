@@ -0,0 +1,163 @@
+"""Headless JSON API for colour matching
+
+    python server.py [--port 8502] [--catalog [name=]hijab_catalog.csv ...]
+
+POST an image as the raw request body to /match (optionally ?k=5,
+?metric=ciede2000 and ?catalog=name) and get
+the palette and best catalog matches back as JSON. Uses the same
+extraction and matching as app.py, without a Streamlit session. With
+COLORMATCH_METRICS=1, GET /metrics serves the stage timings.
+
+    curl --data-binary @outfit.jpg -H 'Content-Type: image/jpeg' \\
+        http://localhost:8502/match
+"""
+import argparse
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import metrics
+import settings
+from analysis import cached_analyze
+from catalog import CatalogRegistry
+from colormatch import rgb_to_hex
+from extract import ImageTooLarge
+from matcher import METRICS
+from workers import Busy
+
+log = logging.getLogger(__name__)
+
+# Suggested wait for clients turned away by admission control
+BUSY_RETRY_SECONDS = 2
+# Largest k accepted; k is part of the result-cache key and every cached
+# result holds k shades
+MAX_K = 50
+
+
+def analysis_to_json(analysis):
+    """JSON-ready dict of an Analysis"""
+    colors = analysis.colors
+    return {
+        'dominant': rgb_to_hex(colors.dominant),
+        'palette': [{'hex': rgb_to_hex(c), 'rgb': list(c), 'population': n}
+                    for c, n in zip(colors.palette, colors.populations)],
+        'matches': [{'name': s.name, 'hex': s.hex, 'stock': s.stock, 'url': s.url}
+                    for s in analysis.matches],
+    }
+
+
+class MatchHandler(BaseHTTPRequestHandler):
+    catalogs = None
+    allow_origin = '*'
+
+    def _send_json(self, status, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Access-Control-Allow-Origin', self.allow_origin)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', self.allow_origin)
+        self.send_header('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            payload = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        elif path == '/health':
+            self._send_json(200, {'status': 'ok',
+                                 'catalog_version': self.catalogs.get().version,
+                                 'catalogs': self.catalogs.loaded()})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/match':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self._send_json(400, {'error': 'Content-Length must be an integer'})
+            return
+        if length <= 0:
+            self._send_json(400, {'error': 'empty request body, expected an image'})
+            return
+        if length > settings.MAX_UPLOAD_BYTES:
+            self._send_json(413, {'error': 'image too large'})
+            return
+        query = parse_qs(url.query)
+        try:
+            k = int(query.get('k', ['3'])[0])
+        except ValueError:
+            self._send_json(400, {'error': 'k must be an integer'})
+            return
+        metric = query.get('metric', [settings.MATCH_METRIC])[0]
+        if metric not in METRICS:
+            self._send_json(400, {'error': f'metric must be one of {", ".join(METRICS)}'})
+            return
+        catalog_name = query.get('catalog', [None])[0]
+        if catalog_name is not None and catalog_name not in self.catalogs:
+            self._send_json(400, {'error': 'catalog must be one of '
+                                           + ', '.join(self.catalogs.paths)})
+            return
+
+        with metrics.timer('read'):
+            data = self.rfile.read(length)
+        try:
+            analysis = cached_analyze(data, self.catalogs.get(catalog_name),
+                                      k=min(max(1, k), MAX_K), metric=metric)
+        except Busy as e:
+            self._send_json(503, {'error': f'busy, retry shortly: {e}'},
+                            headers=[('Retry-After', str(BUSY_RETRY_SECONDS))])
+            return
+        except ImageTooLarge as e:
+            self._send_json(413, {'error': f'image too large: {e}'})
+            return
+        except (OSError, ValueError) as e:
+            self._send_json(400, {'error': f'Error processing image: {e}'})
+            return
+        except Exception:
+            log.exception('match failed')
+            self._send_json(500, {'error': 'internal error'})
+            return
+        self._send_json(200, analysis_to_json(analysis))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--catalog', action='append',
+                        help='catalog path or name=path; repeat for several, the first is '
+                             'the default (default: COLORMATCH_CATALOGS)')
+    parser.add_argument('--allow-origin', default='*',
+                        help='Access-Control-Allow-Origin sent with responses')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    MatchHandler.catalogs = CatalogRegistry.from_specs(args.catalog or settings.CATALOGS)
+    MatchHandler.allow_origin = args.allow_origin
+    server = ThreadingHTTPServer((args.host, args.port), MatchHandler)
+    log.info('serving on http://%s:%d', args.host, args.port)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
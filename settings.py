@@ -0,0 +1,80 @@
+"""Runtime settings, overridable through environment variables"""
+import os
+
+
+def _int(name, default):
+    return int(os.environ.get(name, default))
+
+
+# Catalog used by the app, API server and batch matcher: a CSV, or a file
+# compiled from one with `python catalog.py` (opened with mmap)
+CATALOG = os.environ.get('COLORMATCH_CATALOG', 'hijab_catalog.csv')
+
+# Catalogs that can be selected per request (?catalog=name in the app and
+# JSON API), as comma-separated name=path entries; a bare path is named
+# after its file (hijab_catalog). The first is the default. Catalogs are
+# loaded on first use and the least recently used are dropped once they
+# take more than CATALOG_CACHE_MB
+CATALOGS = os.environ.get('COLORMATCH_CATALOGS', CATALOG).split(',')
+CATALOG_CACHE_MB = _int('COLORMATCH_CATALOG_CACHE_MB', 256)
+
+# Images are decoded at reduced resolution to at most this many pixels
+PIXEL_BUDGET = _int('COLORMATCH_PIXEL_BUDGET', 250_000)
+
+# Largest image decoded, in pixels after any JPEG draft-mode reduction.
+# Bigger uploads are rejected from their header before the bitmap is
+# allocated, so one decode needs at most about 4 bytes per pixel of this
+MAX_DECODE_PIXELS = _int('COLORMATCH_MAX_DECODE_PIXELS', 24_000_000)
+
+# Roughly how many pixels are sampled for quantization; the stride is
+# derived from the decoded pixel count so latency stays flat
+SAMPLE_BUDGET = _int('COLORMATCH_SAMPLE_BUDGET', 25_000)
+
+# Region of interest: when enabled, only the centre crop (this fraction
+# of each side) is sampled, and pixels that look like background (close
+# to the colours along the image border) or skin are left out
+ROI = _int('COLORMATCH_ROI', 0)
+ROI_CROP = float(os.environ.get('COLORMATCH_ROI_CROP', 0.7))
+
+# Processes in the shared pool that runs colour extraction, so
+# concurrent uploads use several cores (0 extracts in the calling thread)
+WORKERS = _int('COLORMATCH_WORKERS', 0)
+
+# Admission control in front of extraction: analyses run at once, uploads
+# allowed to wait for a slot, and how long they may wait (seconds) before
+# being turned away as busy. 0 concurrent analyses means no limit
+MAX_CONCURRENT_ANALYSES = _int('COLORMATCH_MAX_CONCURRENT_ANALYSES', 4)
+MAX_QUEUED_ANALYSES = _int('COLORMATCH_MAX_QUEUED_ANALYSES', 16)
+QUEUE_TIMEOUT = float(os.environ.get('COLORMATCH_QUEUE_TIMEOUT', 10))
+
+# Device pixel ratio the uploaded-photo preview is rendered for; the
+# preview is a JPEG this many times the displayed width
+PREVIEW_DPR = _int('COLORMATCH_PREVIEW_DPR', 2)
+
+# Number of analysed uploads kept in the in-process result cache
+RESULT_CACHE_SIZE = _int('COLORMATCH_RESULT_CACHE_SIZE', 256)
+
+# Largest upload accepted by the JSON API, in bytes
+MAX_UPLOAD_BYTES = _int('COLORMATCH_MAX_UPLOAD_BYTES', 20 * 1024 * 1024)
+
+# Colour difference used for matching: 'redmean' (weighted RGB) or
+# 'ciede2000' (perceptual, CIELAB)
+MATCH_METRIC = os.environ.get('COLORMATCH_METRIC', 'redmean')
+
+# Catalogs with at least this many rows get a spatial colour index;
+# smaller ones are scanned, which is faster at that size
+INDEX_MIN_ROWS = _int('COLORMATCH_INDEX_MIN_ROWS', 5000)
+
+# Precomputed RGB lookup table for redmean matching: bits per channel
+# (5 = 32x32x32 bins, 6 = 64^3; 0 disables) and rows stored per bin.
+# The table is saved next to the catalog CSV unless LUT_PERSIST is 0.
+LUT_BITS = _int('COLORMATCH_LUT_BITS', 0)
+LUT_K = _int('COLORMATCH_LUT_K', 8)
+LUT_PERSIST = _int('COLORMATCH_LUT_PERSIST', 1)
+
+# How often the catalog CSV is checked for changes, in seconds (0 disables)
+CATALOG_POLL_SECONDS = float(os.environ.get('COLORMATCH_CATALOG_POLL_SECONDS', 5))
+
+# Per-stage timing metrics, served in Prometheus format on this local port
+METRICS_ENABLED = _int('COLORMATCH_METRICS', 0)
+METRICS_PORT = _int('COLORMATCH_METRICS_PORT', 9108)
@@ -0,0 +1,66 @@
+import csv
+import json
+import os
+
+import pytest
+from PIL import Image
+
+import batch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(ROOT, 'hijab_catalog.csv')
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i, colour in enumerate([(200, 30, 40), (20, 60, 160), (240, 230, 200)]):
+        path = str(tmp_path / f'{i}.png')
+        Image.new('RGB', (64, 64), colour).save(path)
+        paths.append(path)
+    return paths
+
+
+def _run(paths, output):
+    return batch.run(paths, output, CSV, workers=1)
+
+
+def test_trim_partial_line(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    assert batch.trim_partial_line(str(path)) == 0
+    path.write_bytes(b'{"path": "a"}\n{"path": "b')
+    assert batch.trim_partial_line(str(path)) == 14
+    assert path.read_bytes() == b'{"path": "a"}\n'
+    path.write_bytes(b'{"path": "c')
+    assert batch.trim_partial_line(str(path)) == 0
+    assert path.read_bytes() == b''
+
+
+def test_jsonl_resume_after_interrupted_write(images, tmp_path):
+    output = str(tmp_path / 'matches.jsonl')
+    assert _run(images[:1], output) == (1, 0, 0)
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'path': images[1]})[:12])
+
+    assert _run(images, output) == (2, 1, 0)
+    with open(output, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r['path'] for r in records) == images
+    assert all(r['matches'] for r in records)
+    assert _run(images, output) == (0, 3, 0)
+
+
+def test_csv_resume_writes_one_header(images, tmp_path):
+    output = str(tmp_path / 'matches.csv')
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow(batch.CSV_FIELDS)
+    assert _run(images[:1], output) == (1, 0, 0)
+    # A row cut off after its path field must not count as done
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write(f'{images[1]},0.0')
+
+    assert _run(images, output) == (2, 1, 0)
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == batch.CSV_FIELDS
+    assert sorted(row[0] for row in rows[1:]) == images
@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+import analysis
+from cache import LRUCache
+from catalog import Catalog
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+
+
+def test_lru_disabled_with_zero_entries():
+    cache = LRUCache(0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_lru_evicts_by_bytes_and_reports_evictions():
+    evicted = []
+    cache = LRUCache(10, max_bytes=100, on_evict=lambda key, value: evicted.append(key))
+    cache.put('a', 1, 60)
+    cache.put('b', 2, 30)
+    cache.put('c', 3, 30)
+    assert evicted == ['a']
+    assert cache.nbytes == 60
+    # The newest item is kept even when it alone is over the bound
+    cache.put('d', 4, 500)
+    assert evicted == ['a', 'b', 'c']
+    assert [key for key, _ in cache.items()] == ['d']
+    # Replacing an item counts its new size only
+    cache.put('d', 5, 10)
+    assert cache.nbytes == 10 and len(evicted) == 3
+
+
+def test_lru_resize_updates_bytes_and_evicts():
+    evicted = []
+    cache = LRUCache(10, max_bytes=100, on_evict=lambda key, value: evicted.append(key))
+    cache.put('a', 1, 40)
+    cache.put('b', 2, 40)
+    cache.resize('missing', 1000)
+    assert cache.nbytes == 80 and not evicted
+    cache.resize('b', 20)
+    assert cache.nbytes == 60
+    cache.resize('b', 90)
+    assert evicted == ['a'] and cache.nbytes == 90
+
+
+def test_cached_analyze_is_keyed_on_catalog_version(monkeypatch):
+    monkeypatch.setattr(analysis, 'result_cache', LRUCache(8))
+    pixels = np.random.default_rng(0).integers(0, 256, (40, 40, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, 'PNG')
+    data = buf.getvalue()
+    catalog = Catalog(['Red', 'Blue'], ['#ff0000', '#0000ff'], [1, 1], ['r', 'b'])
+
+    first = analysis.cached_analyze(data, catalog, k=1)
+    assert analysis.cached_analyze(data, catalog, k=1) is first
+    restocked = catalog.with_stock([0, 1])
+    assert restocked.version != catalog.version
+    assert analysis.cached_analyze(data, restocked, k=1) is not first
+    assert analysis.result_cache.stats()['misses'] == 2
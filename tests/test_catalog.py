@@ -0,0 +1,179 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+from catalog import (Catalog, CatalogRegistry, CatalogWatcher, StringTable, catalog_paths,
+                     open_catalog, read_csv)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(ROOT, 'hijab_catalog.csv')
+
+
+def _write_csv(path, names, hexes, stock, urls):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write('name,hex,stock,url\n')
+        for row in zip(names, hexes, stock, urls):
+            f.write(','.join(map(str, row)) + '\n')
+    # Make sure the watcher sees a new mtime even on coarse clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    path = str(tmp_path / 'catalog.csv')
+    shutil.copy(CSV, path)
+    return path
+
+
+def test_catalog_is_read_only():
+    catalog = Catalog.from_csv(CSV)
+    with pytest.raises(ValueError):
+        catalog.rgb[0] = 0
+    with pytest.raises(ValueError):
+        catalog.stock[0] = 0
+
+
+def test_watcher_reuses_indexes_when_only_stock_counts_change(csv_copy):
+    watcher = CatalogWatcher(csv_copy, poll_interval=0)
+    old = watcher.current()
+    names, hexes, stock, urls = read_csv(csv_copy)
+
+    assert not watcher.check()
+    # Counts change but the in-stock set does not
+    _write_csv(csv_copy, names, hexes, [s + 1 if s else 0 for s in stock], urls)
+    assert watcher.check()
+    new = watcher.current()
+    assert new.version != old.version
+    assert new.rgb is old.rgb
+    assert new.in_stock_index is old.in_stock_index and new.lut is old.lut
+    # The caller holding the old catalog keeps it unchanged
+    assert old.stock.tolist() == stock
+
+
+def test_watcher_rebuilds_when_rows_change(csv_copy):
+    watcher = CatalogWatcher(csv_copy, poll_interval=0)
+    old = watcher.current()
+    names, hexes, stock, urls = read_csv(csv_copy)
+    _write_csv(csv_copy, names + ['New'], hexes + ['#123456'], stock + [5], urls + ['u'])
+    assert watcher.check()
+    assert len(watcher.current()) == len(old) + 1
+    assert watcher.current().rgb is not old.rgb
+    assert watcher.reloads == 1
+
+
+def test_watcher_polls_in_the_background(csv_copy):
+    watcher = CatalogWatcher(csv_copy, poll_interval=0.01)
+    try:
+        names, hexes, stock, urls = read_csv(csv_copy)
+        _write_csv(csv_copy, names, hexes, [0] * len(stock), urls)
+        deadline = time.monotonic() + 5
+        while watcher.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert watcher.current().stock.tolist() == [0] * len(stock)
+    finally:
+        watcher.stop()
+
+
+def test_compiled_catalog_round_trips(tmp_path):
+    catalog = Catalog.from_csv(CSV)
+    path = str(tmp_path / 'catalog.bin')
+    catalog.save(path)
+    opened = open_catalog(path)
+
+    assert opened.version == catalog.version
+    assert isinstance(opened.names, StringTable)
+    assert opened.names == catalog.names and opened.urls == catalog.urls
+    np.testing.assert_array_equal(opened.lab, catalog.lab)
+    np.testing.assert_array_equal(opened.stock, catalog.stock)
+    palette = [(200, 30, 40), (20, 20, 20), (240, 230, 200)]
+    for metric in ('redmean', 'ciede2000'):
+        assert ([s.name for s in opened.best_matches(palette, k=5, metric=metric)]
+                == [s.name for s in catalog.best_matches(palette, k=5, metric=metric)])
+
+
+def test_string_table():
+    strings = ['Rose', '', 'Café au lait', 'Navy']
+    table = StringTable(*StringTable.pack(strings))
+    assert len(table) == 4
+    assert list(table) == strings
+    assert table[-1] == 'Navy'
+    assert table == strings and table == StringTable(*StringTable.pack(strings))
+    with pytest.raises(IndexError):
+        table[4]
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / 'catalog.bin'
+    path.write_bytes(b'name,hex,stock,url\n')
+    with pytest.raises(ValueError):
+        Catalog.open(str(path))
+
+
+def test_watcher_reloads_compiled_catalog(tmp_path):
+    catalog = Catalog.from_csv(CSV)
+    path = str(tmp_path / 'catalog.bin')
+    catalog.save(path)
+    watcher = CatalogWatcher(path, poll_interval=0)
+    assert not watcher.check()
+
+    catalog.with_stock([0] * len(catalog)).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert watcher.check()
+    assert not watcher.current().in_stock.any()
+
+
+def test_catalog_paths():
+    assert catalog_paths(['hijab=data/hijab.csv', ' shawls.bin ', '', 'a = b.csv']) == {
+        'hijab': 'data/hijab.csv', 'shawls': 'shawls.bin', 'a': 'b.csv'}
+
+
+def test_registry_loads_lazily_and_evicts_by_size(csv_copy, tmp_path):
+    other = str(tmp_path / 'other.csv')
+    shutil.copy(CSV, other)
+    registry = CatalogRegistry({'hijab': csv_copy, 'other': other}, poll_interval=0)
+    assert registry.loaded() == {} and registry.loads == 0
+    assert 'other' in registry and 'scarves' not in registry
+    with pytest.raises(KeyError):
+        registry.get('scarves')
+
+    hijab = registry.get()
+    assert registry.get('hijab') is hijab
+    assert registry.loaded() == {'hijab': hijab.version} and registry.loads == 1
+
+    # Room for one catalog only: loading the second drops the first
+    small = CatalogRegistry({'hijab': csv_copy, 'other': other},
+                            max_bytes=hijab.nbytes + 1, poll_interval=0)
+    small.get('hijab')
+    small.get('other')
+    assert list(small.loaded()) == ['other']
+    small.get('hijab')
+    assert small.loads == 3
+
+
+def test_registry_counts_reloaded_catalogs_at_their_new_size(csv_copy, tmp_path):
+    other = str(tmp_path / 'other.csv')
+    shutil.copy(CSV, other)
+    size = Catalog.from_csv(CSV).nbytes
+    registry = CatalogRegistry({'hijab': csv_copy, 'other': other},
+                               max_bytes=3 * size, poll_interval=0)
+    registry.get('other')
+    registry.get('hijab')
+    assert registry.stats()['bytes'] == 2 * size
+
+    # hijab grows past the room left, so the older 'other' is dropped
+    names, hexes, stock, urls = read_csv(csv_copy)
+    _write_csv(csv_copy, names * 3, hexes * 3, stock * 3, urls * 3)
+    watcher = dict(registry._watchers.items())['hijab']
+    assert watcher.check()
+    assert list(registry.loaded()) == ['hijab']
+    assert registry.stats()['bytes'] == watcher.current().nbytes > 2 * size
+
+
+def test_registry_requires_a_catalog():
+    with pytest.raises(ValueError):
+        CatalogRegistry({})
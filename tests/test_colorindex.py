@@ -0,0 +1,44 @@
+import numpy as np
+
+from colorindex import ColorIndex
+from matcher import match_palette
+
+
+def _catalog(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, (rows, 3)).astype(np.uint8)
+    rgb[rows // 2:rows // 2 + 50] = rgb[:50]  # duplicate colours tie exactly
+    return rgb
+
+
+def test_query_matches_brute_force():
+    rgb = _catalog(20000)
+    index = ColorIndex(rgb)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        palette = rng.integers(0, 256, (5, 3))
+        rows, distances = index.query(palette, k=5)
+        expected, expected_distances = match_palette(palette, rgb, k=5)
+        assert rows.tolist() == expected.tolist()
+        np.testing.assert_allclose(distances, expected_distances)
+
+
+def test_query_over_a_subset_returns_catalog_rows():
+    rgb = _catalog(20000, seed=2)
+    in_stock = np.random.default_rng(3).random(len(rgb)) < 0.3
+    rows = np.flatnonzero(in_stock)
+    index = ColorIndex(rgb[rows], rows)
+    rng = np.random.default_rng(4)
+    for _ in range(50):
+        palette = rng.integers(0, 256, (3, 3))
+        found, _ = index.query(palette, k=3)
+        expected, _ = match_palette(palette, rgb, k=3, mask=in_stock)
+        assert found.tolist() == expected.tolist()
+
+
+def test_small_and_empty_indexes():
+    rgb = np.array([[0, 0, 0], [255, 255, 255]], dtype=np.uint8)
+    rows, _ = ColorIndex(rgb).query([[250, 250, 250]], k=5)
+    assert rows.tolist() == [1, 0]
+    rows, distances = ColorIndex(rgb[:0]).query([[1, 2, 3]], k=3)
+    assert len(rows) == len(distances) == 0
@@ -0,0 +1,28 @@
+import numpy as np
+
+from colorlut import ColorLUT
+from matcher import match_palette
+
+
+def test_row_numbers_above_uint16_are_kept():
+    rgb = np.array([[10, 20, 30], [200, 10, 10], [10, 200, 10]], dtype=np.uint8)
+    rows = np.array([70000, 65541, 131072])
+    lut = ColorLUT.build(rgb, rows=rows, bits=3, k=2)
+    assert set(np.unique(lut.rows)) <= set(rows.tolist())
+    assert lut.rows.max() >= 1 << 16
+
+
+def test_query_matches_exact_search_on_in_stock_subset():
+    rng = np.random.default_rng(0)
+    catalog_rgb = rng.integers(0, 256, (70000, 3)).astype(np.uint8)
+    in_stock = np.zeros(len(catalog_rgb), dtype=bool)
+    in_stock[rng.choice(len(catalog_rgb), 500, replace=False)] = True
+    in_stock[65536:65636] = True
+    rows = np.flatnonzero(in_stock)
+    lut = ColorLUT.build(catalog_rgb[rows], rows, bits=4, k=8)
+    for _ in range(20):
+        palette = rng.integers(0, 256, (5, 3))
+        found, _ = lut.query(palette, catalog_rgb, k=3)
+        assert in_stock[found].all()
+        exact, _ = match_palette(palette, catalog_rgb, k=3, mask=in_stock)
+        assert found[0] == exact[0]
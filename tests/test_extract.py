@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import settings
+from extract import ImageTooLarge, decode_image, extract_colors, preview_jpeg, roi_pixels
+
+
+def _encode(pixels, fmt='PNG'):
+    buf = io.BytesIO()
+    Image.fromarray(np.asarray(pixels, dtype=np.uint8)).save(buf, fmt)
+    return buf.getvalue()
+
+
+def test_roi_falls_back_to_full_frame_for_white_centre():
+    pixels = np.full((200, 200, 3), 255, dtype=np.uint8)
+    pixels[:20] = (30, 60, 200)
+    data = _encode(pixels)
+    assert len(roi_pixels(Image.open(io.BytesIO(data)))) > 0
+    assert extract_colors(data, roi=True).dominant == extract_colors(data, roi=False).dominant
+
+
+def test_roi_drops_background_and_skin():
+    pixels = np.zeros((200, 200, 3), dtype=np.uint8)
+    pixels[:] = (180, 180, 170)                 # wall
+    pixels[60:160, 60:140] = (20, 120, 40)      # garment
+    pixels[40:60, 80:120] = (224, 172, 140)     # face
+    image = Image.open(io.BytesIO(_encode(pixels)))
+    sampled = roi_pixels(image, stride=1)
+    assert len(sampled)
+    assert (np.abs(sampled.astype(int) - (20, 120, 40)).max(axis=1) == 0).all()
+
+
+def test_oversized_png_is_rejected_from_the_header(monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_DECODE_PIXELS', 100 * 100)
+    with pytest.raises(ImageTooLarge):
+        decode_image(_encode(np.zeros((101, 100, 3))))
+    assert decode_image(_encode(np.zeros((100, 100, 3)))).size == (100, 100)
+
+
+def test_large_jpeg_is_accepted_through_draft_mode(monkeypatch):
+    monkeypatch.setattr(settings, 'MAX_DECODE_PIXELS', 400 * 300)
+    image = decode_image(_encode(np.full((600, 800, 3), 90), 'JPEG'), pixel_budget=100 * 75)
+    assert image.width * image.height <= 100 * 75
+
+
+def test_preview_applies_exif_orientation_and_never_upscales():
+    image = Image.new('RGB', (400, 200), (200, 10, 10))
+    exif = image.getexif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    buf = io.BytesIO()
+    image.save(buf, 'JPEG', exif=exif)
+    preview = Image.open(io.BytesIO(preview_jpeg(Image.open(buf), 560)))
+    assert preview.size == (200, 400)
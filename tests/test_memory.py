@@ -0,0 +1,10 @@
+import pytest
+
+from bench import memory_bound_mb, memory_cases, upload_peak
+
+
+@pytest.mark.parametrize('label, expected', memory_cases())
+def test_upload_peak_rss_is_bounded(label, expected):
+    outcome, peak_mb, _ = upload_peak(label)
+    assert outcome == expected
+    assert peak_mb <= memory_bound_mb()
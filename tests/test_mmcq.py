@@ -0,0 +1,61 @@
+import io
+
+import numpy as np
+import pytest
+from colorthief import MMCQ, ColorThief
+from PIL import Image
+
+import mmcq
+from extract import extract_colors
+
+
+def _reference(pixels, max_color):
+    cmap = MMCQ.quantize([tuple(p) for p in pixels.tolist()], max_color)
+    return cmap.palette, cmap.vboxes.map(lambda x: x['vbox'].count)
+
+
+def _corpus():
+    """Seeded pixel sets: uniform noise, clustered colours and degenerate cases"""
+    rng = np.random.default_rng(2024)
+    for _ in range(30):
+        yield rng.integers(0, 256, (rng.integers(1, 3000), 3))
+    for _ in range(30):
+        centres = rng.integers(0, 256, (rng.integers(1, 8), 3))
+        picks = centres[rng.integers(0, len(centres), 2000)]
+        yield np.clip(picks + rng.integers(-12, 13, picks.shape), 0, 255)
+    yield np.array([[10, 20, 30]])
+    yield np.tile([[200, 0, 0]], (500, 1))
+    yield np.array([[0, 0, 0], [255, 255, 255]] * 50)
+
+
+@pytest.mark.parametrize('max_color', [2, 5, 10])
+def test_quantize_matches_colorthief(max_color):
+    for pixels in _corpus():
+        pixels = pixels.astype(np.uint8)
+        palette, populations = mmcq.quantize(pixels, max_color)
+        ref_palette, ref_populations = _reference(pixels, max_color)
+        assert palette == ref_palette
+        assert populations == ref_populations
+
+
+def test_extract_colors_matches_get_palette():
+    rng = np.random.default_rng(7)
+    for _ in range(5):
+        colours = rng.integers(0, 256, (5, 3), dtype=np.uint8)
+        layout = rng.choice(5, size=(6, 8))
+        image = Image.fromarray(colours[layout]).resize((320, 240), Image.NEAREST)
+        pixels = np.clip(np.asarray(image, dtype=np.int16)
+                         + rng.integers(-6, 7, (240, 320, 3)), 0, 255).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, 'PNG')
+        data = buf.getvalue()
+
+        colors = extract_colors(data, quality=10, pixel_budget=0, roi=False)
+        assert colors.palette == ColorThief(io.BytesIO(data)).get_palette(color_count=5, quality=10)
+
+
+def test_quantize_rejects_bad_input():
+    with pytest.raises(ValueError):
+        mmcq.quantize(np.empty((0, 3), dtype=np.uint8), 5)
+    with pytest.raises(ValueError):
+        mmcq.quantize(np.zeros((4, 3), dtype=np.uint8), 1)
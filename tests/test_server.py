@@ -0,0 +1,68 @@
+import http.client
+import io
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import server
+from catalog import CatalogRegistry
+
+CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'hijab_catalog.csv')
+
+
+@pytest.fixture(scope='module')
+def api():
+    server.MatchHandler.catalogs = CatalogRegistry({'hijab': CATALOG}, poll_interval=0)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), server.MatchHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address
+    httpd.shutdown()
+
+
+def _photo():
+    pixels = np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def _post(address, path, body, headers=None):
+    conn = http.client.HTTPConnection(*address, timeout=10)
+    conn.putrequest('POST', path)
+    for name, value in (headers or {'Content-Length': str(len(body))}).items():
+        conn.putheader(name, value)
+    conn.endheaders()
+    conn.send(body)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_match_returns_palette_and_matches(api):
+    status, body = _post(api, '/match?k=2', _photo())
+    assert status == 200
+    assert len(body['palette']) == 5
+    assert len(body['matches']) == 2
+
+
+def test_malformed_content_length_is_rejected(api):
+    status, body = _post(api, '/match', b'abc', headers={'Content-Length': 'abc'})
+    assert status == 400
+    assert 'Content-Length' in body['error']
+
+
+def test_k_is_clamped(api, monkeypatch):
+    monkeypatch.setattr(server, 'MAX_K', 4)
+    status, body = _post(api, '/match?k=100000', _photo())
+    assert status == 200
+    assert len(body['matches']) == 4
+
+
+def test_unknown_catalog_is_rejected(api):
+    status, _ = _post(api, '/match?catalog=nope', _photo())
+    assert status == 400
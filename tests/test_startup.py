@@ -0,0 +1,12 @@
+from bench import DEFERRED_MODULES, STARTUP_BUDGET_MS, startup_import_time
+
+
+def test_startup_imports_defer_heavy_modules():
+    _, modules = startup_import_time()
+    assert [m for m in DEFERRED_MODULES if m in modules] == []
+
+
+def test_startup_imports_within_budget():
+    # Best of a few runs, so a busy machine doesn't fail the check
+    seconds = min(startup_import_time()[0] for _ in range(5))
+    assert seconds * 1000 <= STARTUP_BUDGET_MS
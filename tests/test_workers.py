@@ -0,0 +1,83 @@
+import io
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import metrics
+import settings
+import workers
+
+
+def _photo():
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 200, (120, 160, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, 'WORKERS', 1)
+    monkeypatch.setattr(metrics, 'enabled', True)
+    monkeypatch.setattr(metrics, '_histograms', {})
+    yield
+    workers.shutdown()
+
+
+def test_pooled_extraction_reports_worker_metrics(pool):
+    colors = workers.extract_colors(_photo())
+    assert len(colors.palette) == 5
+    recorded = metrics.snapshot()
+    for stage in ('decode', 'sample', 'quantize', 'extract'):
+        assert recorded[('stage_seconds', stage)].count == 1
+    assert recorded[('image_pixels', None)].sum == 120 * 160
+
+
+def _hold(admission, entered, release):
+    with admission.slot():
+        entered.set()
+        release.wait(5)
+
+
+def test_admission_queues_then_rejects():
+    admission = workers.Admission(max_active=1, max_queued=1, timeout=5)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold, args=(admission, entered, release))
+    holder.start()
+    entered.wait(5)
+
+    waiter_entered = threading.Event()
+    waiter = threading.Thread(target=_hold, args=(admission, waiter_entered, release))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while admission.queued != 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert admission.queued == 1
+    with pytest.raises(workers.Busy):
+        with admission.slot():
+            pass
+    assert admission.rejected == 1
+
+    release.set()
+    holder.join(5)
+    waiter.join(10)
+    assert waiter_entered.is_set()
+    assert (admission.active, admission.queued) == (0, 0)
+
+
+def test_admission_times_out():
+    admission = workers.Admission(max_active=1, max_queued=4, timeout=0.05)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold, args=(admission, entered, release))
+    holder.start()
+    entered.wait(5)
+    with pytest.raises(workers.Busy):
+        with admission.slot():
+            pass
+    release.set()
+    holder.join(5)
+    assert admission.queued == 0
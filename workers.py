@@ -0,0 +1,159 @@
+"""Admission control and process-wide worker pool for colour extraction
+
+Streamlit sessions and API requests are threads of one process, so
+CPU-bound extraction from concurrent uploads would queue on the GIL.
+With COLORMATCH_WORKERS > 0, extract_colors() runs in a shared pool of
+that many processes instead: the encoded bytes go in and the few palette
+values come back. Matching stays in the calling process, against the
+catalog version it has pinned.
+
+With 0 workers, or when already running inside a worker process (e.g.
+batch.py), extraction runs in the calling thread.
+
+Either way, every extraction first takes a slot from admission, which
+lets COLORMATCH_MAX_CONCURRENT_ANALYSES run at once and queues up to
+COLORMATCH_MAX_QUEUED_ANALYSES more. Past that, or after waiting
+COLORMATCH_QUEUE_TIMEOUT seconds, Busy is raised instead of starting
+another decode, so a burst of uploads cannot run the process out of
+memory.
+"""
+import contextlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+import settings
+
+
+class Busy(RuntimeError):
+    """No analysis slot is free and the admission queue is full"""
+
+
+class Admission:
+    """Bounded number of concurrent analyses with a bounded wait queue"""
+
+    def __init__(self, max_active, max_queued, timeout=None):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def _reject(self, reason):
+        self.rejected += 1
+        raise Busy(reason)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one analysis slot for the duration of the block"""
+        if self.max_active <= 0:
+            yield
+            return
+        start = time.perf_counter()
+        with self._cond:
+            if self.active >= self.max_active:
+                if self.queued >= self.max_queued:
+                    self._reject(f'{self.active} analyses running and {self.queued} waiting')
+                self.queued += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self.active < self.max_active,
+                                                   self.timeout)
+                finally:
+                    self.queued -= 1
+                if not admitted:
+                    self._reject(f'no analysis slot free after {self.timeout:g} s')
+            self.active += 1
+        metrics.observe('admission_wait_seconds', time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+
+admission = Admission(settings.MAX_CONCURRENT_ANALYSES, settings.MAX_QUEUED_ANALYSES,
+                      settings.QUEUE_TIMEOUT)
+
+
+def _admission_metrics():
+    return [('admission_active', 'gauge', 'Analyses running', admission.active),
+            ('admission_queue_depth', 'gauge', 'Uploads waiting for an analysis slot',
+             admission.queued),
+            ('admission_rejected_total', 'counter', 'Uploads turned away as busy',
+             admission.rejected)]
+
+
+metrics.register_collector(_admission_metrics)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Spawned rather than forked: the app and API server have
+                # running threads, which a fork would copy mid-flight
+                _pool = ProcessPoolExecutor(settings.WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _discard_pool(pool, wait=False):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _extract_recorded(data, kwargs, record):
+    """Runs in a pool process: Colors plus the metrics observed making them"""
+    from extract import extract_colors
+
+    metrics.enabled = record
+    with metrics.recording() as observations:
+        colors = extract_colors(data, **kwargs)
+    return colors, observations
+
+
+def extract_colors(data, **kwargs):
+    """extract.extract_colors(data, **kwargs), run on the pool when enabled
+
+    Stage timings and pixel counts of pooled calls are recorded in the
+    worker and sent back with the result, and the whole call, including
+    any wait for a free worker, is also timed as the 'extract' stage. A
+    pool whose worker died (e.g. killed for memory) is replaced and the
+    error is re-raised. Raises Busy when admission turns the upload away.
+    """
+    from extract import extract_colors
+
+    with admission.slot():
+        if settings.WORKERS <= 0 or multiprocessing.parent_process() is not None:
+            return extract_colors(data, **kwargs)
+        pool = _get_pool()
+        with metrics.timer('extract'):
+            try:
+                colors, observations = pool.submit(_extract_recorded, data, kwargs,
+                                                   metrics.enabled).result()
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                raise
+        metrics.replay(observations)
+        return colors
+
+
+def shutdown():
+    """Stop the pool's processes; a later call starts a new pool"""
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        _discard_pool(pool, wait=True)